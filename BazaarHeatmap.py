@@ -1,206 +1,182 @@
 # library
-import seaborn as sns
-import matplotlib.pyplot as plt
-import pandas as pd
-import numpy as np
-import math
+import importlib
+import os
+# Only light modules are imported up front so the window shows quickly; NumPy, pandas, matplotlib and seaborn
+# (through heatmap_cache, heatmap_compute and heatmap_view) are imported when first needed, and preloaded
+# on the background worker once the window is up
 import sqlite3
-from matplotlib.colors import LinearSegmentedColormap
 import tkinter as tk
 from tkinter import ttk
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from threading import Timer
 from preset_database import fetch_all_presets
+from preset_database import fetch_preset
 from preset_database import initialize_database
 from preset_database import insert_preset  # Import the missing function
+import heatmap_timing
+from heatmap_graph import DataflowNode
+from heatmap_worker import HeatmapWorker
 
-initialize_database()
+# Time from startup until the window is shown (reported when stage timing is enabled)
+startup_timing = heatmap_timing.TimingRun("Startup")
 
-# Define the custom colormap with more colors for finer detail
-colors = ["red", "yellow", "green"]
-cmap = LinearSegmentedColormap.from_list("detailed_cmap", colors)
-
-def calculate_value(y, x, damage, mult, base_cooldown):
-    y = y / 100
-    net_damage = damage * mult
-    cooldown_mod = (1 - min(((base_cooldown - 1) / base_cooldown), y))
-    net_cooldown = base_cooldown * cooldown_mod
-    net_dps = net_damage / net_cooldown
-    ideal_dps = (x * net_dps)
-    wasted_dps = (net_dps * (x - (net_cooldown * math.floor(x / net_cooldown))))
-    expected_damage = ideal_dps - wasted_dps
-    return expected_damage
-
-# Global dictionary to track the current canvas for each tab
-current_canvas = {}
+# Global dictionary to track the heatmap view (persistent figure, canvas and cursor label) for each tab
+heatmap_views = {}
 
 # Global dictionary to store heatmap data for each tab
 heatmap_data = {}
 
-def generate_comparison_heatmap(plot_frame, error_label, absolute_damage_var):
-    # Check if heatmaps for Weapon 1 and Weapon 2 exist
-    if "Weapon 1" not in heatmap_data or "Weapon 2" not in heatmap_data:
-        error_label.config(text="Error: Heatmaps for Weapon 1 and Weapon 2 must be generated first.")
-        return
+# Global dictionary to store the parameters (cache key) each tab's heatmap was generated with
+heatmap_parameters = {}
 
-    # Retrieve heatmap data for Weapon 1 and Weapon 2
-    df1 = heatmap_data["Weapon 1"]
-    df2 = heatmap_data["Weapon 2"]
+def absolute_comparison(weapon1, weapon2):
+    """Absolute Damage comparison of two weapon grids, each given as (grid_key, DataFrame)."""
+    (_, df1), (_, df2) = weapon1, weapon2
+    return df1.astype("float64") - df2, None, None  # float64, so the difference adds no float32 rounding
 
-    # Ensure the dimensions of the heatmaps match
-    if df1.shape != df2.shape:
-        error_label.config(text="Error: Heatmaps for Weapon 1 and Weapon 2 must have the same dimensions.")
-        return
+def relative_comparison(weapon1, weapon2):
+    """
+    Relative comparison of two weapon grids, each given as (grid_key, DataFrame).
+    Returns the comparison along with its largest positive and negative value.
+    """
+    import pandas as pd
+    from heatmap_cache import default_cache
+
+    (key1, df1), (key2, _) = weapon1, weapon2
+    # Handle zero values explicitly (vectorized over the whole grid)
+    comparison, max_positive, max_negative = default_cache.get_relative_difference(key1, key2)
+    return pd.DataFrame(comparison, index=df1.index, columns=df1.columns), max_positive, max_negative
+
+# Dataflow graph: each weapon tab's grid feeds both comparisons, which are only recomputed when shown after
+# one of the grids actually changed (not when only colour caps did)
+weapon_grids = {"Weapon 1": DataflowNode(), "Weapon 2": DataflowNode()}
+comparison_nodes = {
+    False: DataflowNode(relative_comparison, weapon_grids.values()),
+    True: DataflowNode(absolute_comparison, weapon_grids.values()),
+}
+
+def store_heatmap(tab_name, df, parameters):
+    """Keep the grid a weapon tab generated, passing it on to the comparisons if it changed."""
+    heatmap_data[tab_name] = df
+    heatmap_parameters[tab_name] = parameters
+    weapon_grids[tab_name].set((parameters, df), parameters)
 
-    # Delete the old heatmap if it exists
-    delete_heatmap("Comparison Tab", plot_frame)
-
-    # Calculate the comparison data
-    if absolute_damage_var.get():
-        # Absolute Damage: Direct difference
-        comparison_df = df1 - df2
-    else:
-        # Relative Damage: Handle zero values explicitly
-        comparison_df = pd.DataFrame(index=df1.index, columns=df1.columns)
-
-        for i in range(df1.shape[0]):
-            for j in range(df1.shape[1]):
-                val1 = df1.iloc[i, j]
-                val2 = df2.iloc[i, j]
-
-                if val1 == 0 and val2 == 0:
-                    comparison_df.iloc[i, j] = 0  # Both values are zero
-                elif val1 == 0 or val2 == 0:
-                    comparison_df.iloc[i, j] = None  # Skip writing data for now
-                elif val1 > val2:
-                    comparison_df.iloc[i, j] = (val1 - val2) / val2  # Ratio to the smaller value
-                else:
-                    comparison_df.iloc[i, j] = -1 * (val2 - val1) / val1  # Multiply by -1 if larger value is from df2
+# Background worker generating heatmaps off the Tk thread (created in main, once the Tk root exists)
+heatmap_worker = None
 
-        # Fill skipped cells with the value of the cell with the greatest magnitude and the same sign
-        max_positive = comparison_df[comparison_df > 0].max().max()  # Largest positive value
-        max_negative = comparison_df[comparison_df < 0].min().min()  # Largest negative value (most negative)
+# Global dictionary of the tabs whose contents haven't been built yet, and the function building each
+deferred_tabs = {}
 
-        for i in range(comparison_df.shape[0]):
-            for j in range(comparison_df.shape[1]):
-                if pd.isna(comparison_df.iloc[i, j]):  # Check for skipped cells
-                    if df1.iloc[i, j] == 0:
-                        comparison_df.iloc[i, j] = max_negative * 1.01  # Use the largest negative value
-                    elif df2.iloc[i, j] == 0:
-                        comparison_df.iloc[i, j] = max_positive * 1.01  # Use the largest positive value
+# Directory of a sweep cube built with sweep_cube.py; if set, the Sweep Tab shows slices of it
+sweep_cube_path = os.environ.get("BAZAAR_SWEEP_CUBE") or None
+
+def preload_modules(job):
+    """Import the heavy modules on the background worker, so the first generate doesn't wait for them."""
+    for module in ("heatmap_cache", "heatmap_compute", "heatmap_view"):
+        importlib.import_module(module)
+
+def add_deferred_tab(notebook, text, build):
+    """Add an empty tab to the notebook now, and fill it with build(tab) the first time it is selected."""
+    tab = ttk.Frame(notebook)
+    notebook.add(tab, text=text)
+    deferred_tabs[str(tab)] = (tab, build)
+
+def build_selected_tab(notebook):
+    """Build the contents of the notebook's selected tab, if that hasn't happened yet."""
+    deferred = deferred_tabs.pop(notebook.select(), None)
+    if deferred is not None:
+        tab, build = deferred
+        build(tab)
+
+def get_heatmap_view(tab_name, plot_frame, label_side=tk.TOP):
+    """Get the heatmap view for a tab, creating it the first time a heatmap is generated there."""
+    if heatmap_views.get(tab_name) is None:
+        from heatmap_view import HeatmapView
+        heatmap_views[tab_name] = HeatmapView(plot_frame, label_side)
+    return heatmap_views[tab_name]
+
+def generate_comparison_heatmap(plot_frame, error_label, absolute_damage_var, status_label):
+    timing = heatmap_timing.TimingRun("Comparison Tab")
+    with timing.span("parse"):
+        # Check if heatmaps for Weapon 1 and Weapon 2 exist
+        if "Weapon 1" not in heatmap_data or "Weapon 2" not in heatmap_data:
+            error_label.config(text="Error: Heatmaps for Weapon 1 and Weapon 2 must be generated first.")
+            return
+
+        # Ensure the dimensions of the heatmaps match
+        if heatmap_data["Weapon 1"].shape != heatmap_data["Weapon 2"].shape:
+            error_label.config(text="Error: Heatmaps for Weapon 1 and Weapon 2 must have the same dimensions.")
+            return
 
     # Clear the error message
     error_label.config(text="")
 
-    # Create a custom colormap where 0 is always yellow
-    custom_cmap = LinearSegmentedColormap.from_list("custom_cmap", ["red", "yellow", "green"])
-
-    # Create the heatmap figure with dynamic sizing
-    fig, ax = plt.subplots(figsize=(plot_frame.winfo_width() / 100, 5))  # Dynamic width
-    sns.heatmap(
-        comparison_df.astype(float),  # Ensure the data is numeric
-        cbar_kws={'orientation': 'vertical'},  # Color bar orientation
-        yticklabels=True,  # Show y-axis labels
-        cmap=custom_cmap,  # Use the custom colormap
-        center=0,  # Center the color scale on 0
-        ax=ax
-    )
-    cbar = ax.collections[0].colorbar
-
-    # Modify the legend (color bar) formatting
-    if absolute_damage_var.get():
-        # Absolute Damage: Display as raw values
-        cbar.set_ticks(np.linspace(comparison_df.values.min(), comparison_df.values.max(), 5))
-        cbar.set_ticklabels([f"{tick:.2f}" for tick in np.linspace(comparison_df.values.min(), comparison_df.values.max(), 5)])
-    else:
-        # Relative Damage: Display as percentages
-        cbar.set_ticks(np.linspace(comparison_df.values.min(), comparison_df.values.max(), 5))
-        cbar.set_ticklabels([f"{tick * 100:.0f}%" for tick in np.linspace(comparison_df.values.min(), comparison_df.values.max(), 5)])
-
-    ax.set_xlabel("Combat Duration (seconds)")
-
-    # Modify the x-axis to have ticks every 5 units
-    x_ticks = range(0, comparison_df.shape[1] + 1, 5)
-    ax.set_xticks(x_ticks)
-    ax.set_xticklabels(x_ticks)
-
-    # Modify the y-axis to increase as it gets further away from the x-axis
-    y_ticks = np.arange(0, comparison_df.shape[0], 10)
-    ax.set_yticks(y_ticks)
-    ax.set_yticklabels([f"{(comparison_df.shape[0] - tick - 1) / 100:.0%}" for tick in y_ticks])
-
-    # Embed the heatmap in the Tkinter window
-    canvas = FigureCanvasTkAgg(fig, master=plot_frame)
-    canvas_widget = canvas.get_tk_widget()
-    canvas_widget.pack(fill=tk.BOTH, expand=True)
-    canvas.draw()
-
-    # Add a label below the heatmap to display cursor information
-    comparison_info_label = ttk.Label(plot_frame, text="", anchor="center", justify="center")
-    comparison_info_label.pack(side=tk.BOTTOM, pady=5)
-
-    # Bind mouse motion event to display cursor coordinates and cell value
-    def on_mouse_move(event):
-        # Get the cursor position in pixels
-        x_pixel, y_pixel = event.x, event.y
-
-        # Convert pixel coordinates to data coordinates
-        if canvas_widget.winfo_containing(event.x_root, event.y_root) == canvas_widget:
-            x_data, y_data = ax.transData.inverted().transform((x_pixel, y_pixel))
-            x_data = int(np.floor(x_data))  # Use floor to align with heatmap cells
-            y_data = int(np.floor(y_data))
-            if 0 <= x_data < comparison_df.shape[1] and 0 <= y_data < comparison_df.shape[0]:
-                # Flip the y_data index to match the heatmap's orientation
-                flipped_y_data = comparison_df.shape[0] - 1 - y_data
-                value = comparison_df.iloc[flipped_y_data, x_data]
-
-                # Logic for "Absolute Damage" toggle
-                if absolute_damage_var.get():
-                    # Absolute Damage logic
-                    if value > 0:
-                        result_text = f"Weapon 1 will deal {value:.2f} more damage than Weapon 2."
-                    elif value < 0:
-                        result_text = f"Weapon 2 will deal {value * -1:.2f} more damage than Weapon 1."
-                    else:
-                        result_text = "Both weapons will deal the same amount of damage."
+    absolute_damage = absolute_damage_var.get()
+    view = get_heatmap_view("Comparison Tab", plot_frame, tk.BOTTOM)
+
+    # Runs on the background worker: bring the comparison up to date (only recomputed if a weapon grid
+    # changed since it was last shown) and render it off-screen
+    def work(job):
+        with timing.span("compute"):
+            comparison_df, max_positive, max_negative = comparison_nodes[absolute_damage].get()
+        if job.cancelled:
+            return None
+
+        # Update the comparison heatmap in place (the figure is only built on the first run), with a coarse
+        # preview first for grids much larger than the plot
+        view.render_progressive(job, lambda: view.show_comparison(comparison_df, absolute_damage), comparison_df.shape, timing)
+        return comparison_df, max_positive, max_negative
+
+    # Runs on the Tk thread once the worker is done
+    def on_done(result):
+        from heatmap_render import format_damage
+
+        comparison_df, max_positive, max_negative = result
+
+        # Grid axes (duration in seconds, CDR in percent) shared by both weapon heatmaps
+        durations = comparison_df.columns.to_numpy()
+        cdr_values = comparison_df.index.to_numpy()
+
+        # Describe the cell under the cursor for the hover readout
+        def describe_cell(row, column, value):
+            # Logic for "Absolute Damage" toggle
+            if absolute_damage:
+                # Absolute Damage logic
+                if value > 0:
+                    result_text = f"Weapon 1 will deal {format_damage(value)} more damage than Weapon 2."
+                elif value < 0:
+                    result_text = f"Weapon 2 will deal {format_damage(value * -1)} more damage than Weapon 1."
                 else:
-                    # Relative Damage logic
-                    if value == 0:
-                        result_text = "Both weapons are equally strong."
-                    elif value > max_positive:
-                        result_text = "Weapon 1 is infinitely stronger than Weapon 2."
-                    elif value < max_negative:
-                        result_text = "Weapon 2 is infinitely stronger than Weapon 1."
-                    elif value > 0:
-                        result_text = f"Weapon 1 is {value * 100:.2f}% stronger than Weapon 2."
-                    else:
-                        result_text = f"Weapon 2 is {abs(value) * 100:.2f}% stronger than Weapon 1."
-
-                comparison_info_label.config(
-                    text=f"If combat lasts {x_data} seconds,\n"
-                         f"and you apply {y_data}% CDR relative to base CD,\n"
-                         f"{result_text}"
-                )
-
-    canvas_widget.bind("<Motion>", on_mouse_move)
-
-    # Bind a resize event to dynamically adjust the heatmap
-    def on_resize(event):
-        fig.set_size_inches(plot_frame.winfo_width() / 100, 5)
-        canvas.draw()
-
-    plot_frame.bind("<Configure>", on_resize)
-
-    # Track the current canvas and label for this tab
-    current_canvas["Comparison Tab"] = (canvas, comparison_info_label)
-
-    # Explicitly close the figure to avoid stale figures
-    plt.close(fig)
-
-def create_comparison_tab(notebook):
-    tab = ttk.Frame(notebook)
-    notebook.add(tab, text="Comparison Tab")
+                    result_text = "Both weapons will deal the same amount of damage."
+            else:
+                # Relative Damage logic
+                if value == 0:
+                    result_text = "Both weapons are equally strong."
+                elif value > max_positive:
+                    result_text = "Weapon 1 is infinitely stronger than Weapon 2."
+                elif value < max_negative:
+                    result_text = "Weapon 2 is infinitely stronger than Weapon 1."
+                elif value > 0:
+                    result_text = f"Weapon 1 is {value * 100:.2f}% stronger than Weapon 2."
+                else:
+                    result_text = f"Weapon 2 is {abs(value) * 100:.2f}% stronger than Weapon 1."
+
+            return (f"If combat lasts {durations[column]:g} seconds,\n"
+                    f"and you apply {cdr_values[row]:g}% CDR relative to base CD,\n"
+                    f"{result_text}")
 
+        with timing.span("present"):
+            view.set_hover(comparison_df.values, describe_cell)
+            view.present()
+        timing.finish()
+        status_label.config(text=timing.summary() if heatmap_timing.enabled else "")
+
+    def on_error(e):
+        status_label.config(text="")
+        error_label.config(text=f"Error: {e}")
+
+    status_label.config(text="Generating...")
+    heatmap_worker.submit("Comparison Tab", work, on_done, on_error, lambda preview: view.present())
+
+def create_comparison_tab(tab):
     frame = ttk.Frame(tab, padding="10")
     frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
 
@@ -219,10 +195,14 @@ def create_comparison_tab(notebook):
     generate_button = ttk.Button(
         frame,
         text="Generate Comparison Table",
-        command=lambda: generate_comparison_heatmap(plot_frame, error_label, absolute_damage_var)
+        command=lambda: generate_comparison_heatmap(plot_frame, error_label, absolute_damage_var, status_label)
     )
     generate_button.grid(row=2, column=0, columnspan=2, pady=10)
 
+    # Label showing whether the comparison is still being generated
+    status_label = ttk.Label(frame, text="")
+    status_label.grid(row=3, column=0, columnspan=2)
+
     # Frame for displaying the comparison heatmap
     plot_frame = ttk.Frame(tab, padding="10")
     plot_frame.grid(row=3, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
@@ -231,126 +211,411 @@ def create_comparison_tab(notebook):
     tab.rowconfigure(3, weight=1)  # Allow row 3 (plot_frame) to expand
     tab.columnconfigure(0, weight=1)  # Allow column 0 to expand
 
+    # Coming back to the tab after a weapon heatmap changed brings the shown comparison up to date
+    def refresh_if_stale(event):
+        if "Comparison Tab" in heatmap_views and comparison_nodes[absolute_damage_var.get()].dirty:
+            generate_comparison_heatmap(plot_frame, error_label, absolute_damage_var, status_label)
+
+    tab.bind("<Map>", refresh_if_stale)
+
     return tab
 
-def generate_heatmap(damage_entry, mult_entry, base_cooldown_entry, error_label, plot_frame, tab_name, low_cap_entry, high_cap_entry, end_at_rope_var, max_cdr_entry):
-    global cmap  # Use the global colormap
+def generate_ranking_heatmap(plot_frame, error_label, status_label, preset_listbox, include_tabs_var, max_cdr_entry, end_at_rope_var, fine_grid_var, show_margin_var):
+    import pandas as pd
+    from heatmap_cache import default_cache, grid_key
+    from heatmap_render import format_damage
+    from heatmap_compute import cdr_axis, duration_axis, rank_grids, cell_ranking
 
     try:
-        damage = float(damage_entry.get())
-        mult = int(mult_entry.get())
-        base_cooldown = float(base_cooldown_entry.get())
-        low_cap = float(low_cap_entry.get()) if low_cap_entry.get() else None
-        high_cap = float(high_cap_entry.get()) if high_cap_entry.get() else None
-        max_cdr = int(max_cdr_entry.get()) + 1  # Add one to the Max CDR value
-        if max_cdr < 11 or max_cdr > 101:  # Adjusted range check
+        max_cdr = int(max_cdr_entry.get())
+        if max_cdr < 10 or max_cdr > 100:
             raise ValueError("Maximum CDR must be an integer between 10 and 100.")
     except ValueError as e:
         error_label.config(text=str(e))
         return
 
-    error_label.config(text="")  # Clear error message
+    x_range = 30 if end_at_rope_var.get() else 60
+    step = 0.1 if fine_grid_var.get() else 1
+    key = grid_key(0, 1, 1, max_cdr, x_range, step)  # Dimensions every compared grid must have
+
+    # Collect the items to compare: selected presets and, optionally, every generated weapon tab
+    names = []
+    parameters = []
+    for index in preset_listbox.curselection():
+        preset = fetch_preset(preset_listbox.get(index))
+        names.append(preset[1])
+        parameters.append(grid_key(preset[2], preset[3], preset[4], max_cdr, x_range, step))
+    if include_tabs_var.get():
+        for tab_name, tab_parameters in heatmap_parameters.items():
+            if tab_parameters[3:] != key[3:]:
+                error_label.config(text=f"Error: {tab_name} must use the same Maximum CDR, End at storm and Fine grid settings.")
+                return
+            names.append(tab_name)
+            parameters.append(tab_parameters)
+    if len(names) < 2:
+        error_label.config(text="Error: Select at least two items to compare.")
+        return
 
-    # Ensure the previous heatmap is deleted before generating a new one
-    delete_heatmap(tab_name, plot_frame)
+    error_label.config(text="")
+    show_margin = show_margin_var.get()
+    view = get_heatmap_view("Ranking Tab", plot_frame, tk.BOTTOM)
+    cdr_values = cdr_axis(max_cdr, step)
+    durations = duration_axis(x_range, step)
+
+    # Runs on the background worker: stack every item's grid and find the best item per cell in one pass
+    def work(job):
+        stack, best, margin = rank_grids([default_cache.get_grid(*item_parameters) for item_parameters in parameters])
+        if job.cancelled:
+            return None
+
+        if show_margin:
+            margin_df = pd.DataFrame(margin, index=cdr_values, columns=durations)
+            view.render_offscreen(lambda: view.show_heatmap(margin_df, 0, max(margin_df.values.max(), 1e-9)))
+        else:
+            best_df = pd.DataFrame(best, index=cdr_values, columns=durations)
+            view.render_offscreen(lambda: view.show_ranking(best_df, names))
+        return stack, best
+
+    # Runs on the Tk thread once the worker is done
+    def on_done(result):
+        stack, best = result
+        status_label.config(text="")
+
+        # Describe the full ranking of the cell under the cursor (the ten best items for long lists)
+        def describe_cell(row, column, value):
+            order, values = cell_ranking(stack, row, column)
+            lines = [f"{place + 1}. {names[item]}: {format_damage(item_value)} damage" for place, (item, item_value) in enumerate(zip(order[:10], values[:10]))]
+            if len(order) > 10:
+                lines.append(f"... and {len(order) - 10} more")
+            return (f"If combat lasts {durations[column]:g} seconds,\n"
+                    f"and you apply {cdr_values[row]:g}% CDR relative to base CD,\n"
+                    f"{names[order[0]]} is the best item, {format_damage(float(values[0]) - float(values[1]))} damage ahead of {names[order[1]]}.\n"
+                    + "\n".join(lines))
+
+        view.set_hover(best, describe_cell)
+        view.present()
+
+    def on_error(e):
+        status_label.config(text="")
+        error_label.config(text=f"Error: {e}")
+
+    status_label.config(text="Generating...")
+    heatmap_worker.submit("Ranking Tab", work, on_done, on_error)
+
+def create_ranking_tab(tab):
+    frame = ttk.Frame(tab, padding="10")
+    frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+
+    error_label = ttk.Label(frame, text="", foreground="red")
+    error_label.grid(row=0, column=0, columnspan=3)
+
+    # List of presets to compare (hold Ctrl or Shift to select several)
+    ttk.Label(frame, text="Presets:").grid(row=1, column=0, sticky=(tk.W, tk.N))
+    preset_listbox = tk.Listbox(frame, selectmode=tk.EXTENDED, height=8, width=40, exportselection=False)
+    preset_listbox.grid(row=1, column=1, sticky=(tk.W, tk.E))
+    preset_scrollbar = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=preset_listbox.yview)
+    preset_scrollbar.grid(row=1, column=2, sticky=(tk.N, tk.S, tk.W))
+    preset_listbox.config(yscrollcommand=preset_scrollbar.set)
+    for preset in fetch_all_presets():
+        preset_listbox.insert(tk.END, preset[1])
+
+    # Add a checkbox to include the heatmaps generated in the weapon tabs
+    include_tabs_var = tk.BooleanVar(value=False)
+    include_tabs_checkbox = ttk.Checkbutton(frame, text="Include weapon tabs", variable=include_tabs_var)
+    include_tabs_checkbox.grid(row=2, column=0, columnspan=2, sticky=tk.W)
+
+    ttk.Label(frame, text="Maximum CDR:").grid(row=3, column=0, sticky=tk.W)
+    max_cdr_entry = ttk.Entry(frame)
+    max_cdr_entry.insert(0, "50")
+    max_cdr_entry.grid(row=3, column=1, sticky=tk.W)
+
+    end_at_rope_var = tk.BooleanVar(value=False)
+    end_at_rope_checkbox = ttk.Checkbutton(frame, text="End at storm", variable=end_at_rope_var)
+    end_at_rope_checkbox.grid(row=4, column=0, sticky=tk.W)
+
+    fine_grid_var = tk.BooleanVar(value=False)
+    fine_grid_checkbox = ttk.Checkbutton(frame, text="Fine grid", variable=fine_grid_var)
+    fine_grid_checkbox.grid(row=4, column=1, sticky=tk.W)
+
+    # Add a checkbox to show by how much the best item wins instead of which item it is
+    show_margin_var = tk.BooleanVar(value=False)
+    show_margin_checkbox = ttk.Checkbutton(frame, text="Show margin over runner-up", variable=show_margin_var)
+    show_margin_checkbox.grid(row=5, column=0, columnspan=2, sticky=tk.W)
+
+    generate_button = ttk.Button(
+        frame,
+        text="Generate Best Item Map",
+        command=lambda: generate_ranking_heatmap(
+            plot_frame, error_label, status_label, preset_listbox, include_tabs_var,
+            max_cdr_entry, end_at_rope_var, fine_grid_var, show_margin_var
+        )
+    )
+    generate_button.grid(row=6, column=0, sticky=tk.W, pady=10)
+
+    # Label showing whether the map is still being generated
+    status_label = ttk.Label(frame, text="")
+    status_label.grid(row=6, column=1, sticky=tk.W)
+
+    # Frame for displaying the best item map
+    plot_frame = ttk.Frame(tab, padding="10")
+    plot_frame.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+
+    # Configure resizing behavior for the plot frame
+    tab.rowconfigure(1, weight=1)  # Allow row 1 (plot_frame) to expand
+    tab.columnconfigure(0, weight=1)  # Allow column 0 to expand
+
+    return tab
+
+def generate_sweep_heatmap(plot_frame, error_label, status_label, damage_entry, y_var, x_var, fixed_entries):
+    from sweep_cube import AXIS_LABELS, SweepCube
+
+    y = y_var.get()
+    x = x_var.get()
+    try:
+        damage = float(damage_entry.get())
+        # Every axis that isn't shown is sliced at the value in its entry
+        fixed = {axis: float(entry.get()) for axis, entry in fixed_entries.items() if axis not in (y, x)}
+    except ValueError:
+        error_label.config(text="Error: Damage and the values of the axes that aren't shown must be numbers.")
+        return
+    if y == x:
+        error_label.config(text="Error: The y-axis and x-axis must be different.")
+        return
+
+    error_label.config(text="")
+    view = get_heatmap_view("Sweep Tab", plot_frame)
+
+    # Runs on the background worker: read the slice from the memory-mapped cube (nothing is recomputed)
+    def work(job):
+        df = SweepCube(sweep_cube_path).frame(y, x, damage, **fixed)
+        if job.cancelled:
+            return None
+        view.render_offscreen(lambda: view.show_slice(df, df.values.min(), df.values.max(), AXIS_LABELS[y], AXIS_LABELS[x]))
+        return df
+
+    # Runs on the Tk thread once the worker is done
+    def on_done(df):
+        status_label.config(text="")
+        y_values = df.index.to_numpy()
+        x_values = df.columns.to_numpy()
+        phrases = {
+            "base_cooldown": "a base cooldown of {:g} seconds",
+            "cdr": "{:g}% CDR",
+            "duration": "{:g} seconds of combat",
+            "mult": "a mult of {:g}",
+        }
+
+        def describe_cell(row, column, value):
+            return (f"With {phrases[y].format(y_values[row])} and {phrases[x].format(x_values[column])},\n"
+                    f"you can expect this item to deal {value:.2f} damage.")
+
+        view.set_hover(df.values, describe_cell)
+        view.present()
+
+    def on_error(e):
+        status_label.config(text="")
+        error_label.config(text=f"Error: {e}")
+
+    status_label.config(text="Generating...")
+    heatmap_worker.submit("Sweep Tab", work, on_done, on_error)
+
+def create_sweep_tab(tab):
+    from sweep_cube import AXES, SweepCube
+
+    frame = ttk.Frame(tab, padding="10")
+    frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+
+    error_label = ttk.Label(frame, text="", foreground="red")
+    error_label.grid(row=0, column=0, columnspan=4)
+
+    ttk.Label(frame, text="Damage:").grid(row=1, column=0, sticky=tk.W)
+    damage_entry = ttk.Entry(frame)
+    damage_entry.insert(0, "1")
+    damage_entry.grid(row=1, column=1, sticky=tk.W)
+
+    # Which swept variables go on the axes
+    ttk.Label(frame, text="Y-axis:").grid(row=2, column=0, sticky=tk.W)
+    y_var = tk.StringVar(value="base_cooldown")
+    ttk.Combobox(frame, textvariable=y_var, values=AXES, state="readonly").grid(row=2, column=1, sticky=tk.W)
+    ttk.Label(frame, text="X-axis:").grid(row=2, column=2, sticky=tk.W)
+    x_var = tk.StringVar(value="duration")
+    ttk.Combobox(frame, textvariable=x_var, values=AXES, state="readonly").grid(row=2, column=3, sticky=tk.W)
+
+    # Values to slice the other axes at, defaulting to the first value the cube was built with
+    cube_axes = SweepCube(sweep_cube_path).axes
+    labels = {"base_cooldown": "Base Cooldown:", "cdr": "CDR:", "duration": "Combat Duration:", "mult": "Mult:"}
+    fixed_entries = {}
+    for i, axis in enumerate(AXES):
+        ttk.Label(frame, text=labels[axis]).grid(row=3 + i // 2, column=2 * (i % 2), sticky=tk.W)
+        entry = ttk.Entry(frame)
+        entry.insert(0, f"{cube_axes[axis].min():g}")
+        entry.grid(row=3 + i // 2, column=2 * (i % 2) + 1, sticky=tk.W)
+        fixed_entries[axis] = entry
+
+    generate_button = ttk.Button(
+        frame,
+        text="Generate Slice",
+        command=lambda: generate_sweep_heatmap(plot_frame, error_label, status_label, damage_entry, y_var, x_var, fixed_entries)
+    )
+    generate_button.grid(row=5, column=0, sticky=tk.W, pady=10)
+
+    # Label showing whether the slice is still being generated
+    status_label = ttk.Label(frame, text="")
+    status_label.grid(row=5, column=1, sticky=tk.W)
+
+    # Frame for displaying the slice
+    plot_frame = ttk.Frame(tab, padding="10")
+    plot_frame.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+
+    # Configure resizing behavior for the plot frame
+    tab.rowconfigure(1, weight=1)  # Allow row 1 (plot_frame) to expand
+    tab.columnconfigure(0, weight=1)  # Allow column 0 to expand
+
+    return tab
+
+def describe_heatmap_cell(df):
+    """Hover readout for a single item heatmap: describes the cell under the cursor."""
+    from heatmap_render import format_damage
+
+    cdr_values = df.index.to_numpy()
+    durations = df.columns.to_numpy()
+
+    def describe_cell(row, column, value):
+        return (f"If combat lasts {durations[column]:g} seconds,\n"
+                f"and you apply {cdr_values[row]:g}% CDR relative to base CD,\n"
+                f"you can expect this item to deal {format_damage(value)} damage.")
+
+    return describe_cell
+
+def generate_heatmap(damage_entry, mult_entry, base_cooldown_entry, error_label, plot_frame, tab_name, low_cap_entry, high_cap_entry, end_at_rope_var, max_cdr_entry, fine_grid_var, status_label):
+    timing = heatmap_timing.TimingRun(tab_name)
+    try:
+        with timing.span("parse"):
+            damage = float(damage_entry.get())
+            mult = int(mult_entry.get())
+            base_cooldown = float(base_cooldown_entry.get())
+            low_cap = float(low_cap_entry.get()) if low_cap_entry.get() else None
+            high_cap = float(high_cap_entry.get()) if high_cap_entry.get() else None
+            max_cdr = int(max_cdr_entry.get()) + 1  # Add one to the Max CDR value
+            if max_cdr < 11 or max_cdr > 101:  # Adjusted range check
+                raise ValueError("Maximum CDR must be an integer between 10 and 100.")
+    except ValueError as e:
+        error_label.config(text=str(e))
+        return
+
+    error_label.config(text="")  # Clear error message
 
     # Determine the x-axis length based on the "end at storm" checkbox
     x_range = 30 if end_at_rope_var.get() else 60
 
-    # Recalculate the dataset and regenerate the heatmap
-    df = pd.DataFrame(
-        [[calculate_value(max_cdr - 1 - y, x, damage, mult, base_cooldown) for x in range(x_range)] for y in range(max_cdr)],
-        columns=range(x_range),
-        index=[f"{y / 100:.0%}" for y in range(max_cdr)]  # Format y values as percentages
-    )
+    # Fine grid uses 0.1 s duration steps and 0.1% CDR steps
+    step = 0.1 if fine_grid_var.get() else 1
 
-    # Store the heatmap data for this tab
-    heatmap_data[tab_name] = df
+    view = get_heatmap_view(tab_name, plot_frame)
 
     # Set vmin and vmax based on user-provided caps
-    vmin = low_cap if low_cap is not None else df.values.min()
-    vmax = high_cap if high_cap is not None else df.values.max()
-
-    # Create the heatmap figure with dynamic sizing
-    fig, ax = plt.subplots(figsize=(plot_frame.winfo_width() / 100, 5))  # Dynamic width
-    sns.heatmap(
-        df,
-        cbar_kws={'orientation': 'vertical'},
-        yticklabels=True,  # Use the DataFrame index for yticklabels
-        vmin=vmin,
-        vmax=vmax,
-        cmap=cmap,
-        ax=ax
-    )
-    cbar = ax.collections[0].colorbar
-    cbar.set_ticks(np.linspace(vmin, vmax, 5))
-    cbar.set_ticklabels([f"{tick:.2f}" for tick in np.linspace(vmin, vmax, 5)])
-    ax.set_yticks(np.linspace(0, max_cdr - 1, 11))
-    ax.set_yticklabels([f"{y / 100:.0%}" for y in np.linspace(max_cdr - 1, 0, 11)])  # Correct order for tick labels
-    ax.set_xticks(range(0, x_range + 1, 5))
-    ax.set_xticklabels(range(0, x_range + 1, 5))
-    ax.set_xlabel("Combat Duration (seconds)")
-
-    # Embed the heatmap in the Tkinter window
-    canvas = FigureCanvasTkAgg(fig, master=plot_frame)
-    canvas_widget = canvas.get_tk_widget()
-    canvas_widget.pack(fill=tk.BOTH, expand=True)
-    canvas.draw()
-
-    # Add a label above the heatmap to display cursor information
-    cursor_info_label = ttk.Label(plot_frame, text="", anchor="center", justify="center")
-    cursor_info_label.pack(side=tk.TOP, pady=5)
-
-    # Bind mouse motion event to display cursor coordinates and cell value
-    def on_mouse_move(event):
-        # Get the cursor position in pixels
-        x_pixel, y_pixel = event.x, event.y
-
-        # Convert pixel coordinates to data coordinates
-        if ax.contains_point((x_pixel, y_pixel)):
-            x_data, y_data = ax.transData.inverted().transform((x_pixel, y_pixel))
-            x_data = int(round(x_data))
-            y_data = int(round(y_data))
-            if 0 <= x_data < x_range and 0 <= y_data < max_cdr:
-                # Flip the y_data index to match the heatmap's orientation
-                flipped_y_data = max_cdr - 1 - y_data
-                value = df.iloc[flipped_y_data, x_data]
-                cursor_info_label.config(
-                    text=f"If combat lasts {x_data} seconds,\n"
-                         f"and you apply {y_data}% CDR relative to base CD,\n"  # Adjusted y value
-                         f"you can expect this item to deal {value:.2f} damage."
-                )
-
-    canvas_widget.bind("<Motion>", on_mouse_move)
-
-    # Bind a resize event to dynamically adjust the heatmap
-    def on_resize(event):
-        fig.set_size_inches(plot_frame.winfo_width() / 100, 5)
-        canvas.draw()
-
-    plot_frame.bind("<Configure>", on_resize)
-
-    # Track the current canvas for this tab
-    current_canvas[tab_name] = canvas
-
-    # Explicitly close the figure to avoid stale figures
-    plt.close(fig)
-
-def delete_heatmap(tab_name, plot_frame):
-    global current_canvas  # Access the global canvas tracker
-    if tab_name in current_canvas and current_canvas[tab_name] is not None:
-        # Destroy the current canvas widget
-        if isinstance(current_canvas[tab_name], tuple):
-            canvas, info_label = current_canvas[tab_name]
-            canvas.get_tk_widget().destroy()
-            info_label.destroy()  # Destroy the additional label
+    def color_limits(df):
+        vmin = low_cap if low_cap is not None else df.values.min()
+        vmax = high_cap if high_cap is not None else df.values.max()
+        return vmin, vmax
+
+    # Runs on the background worker: calculate the dataset and render the heatmap off-screen
+    def work(job):
+        from heatmap_cache import default_cache
+
+        parameters = (damage, mult, base_cooldown, max_cdr - 1, x_range, step)
+        previewed = step < 1 and not default_cache.has_grid(*parameters)
+        if previewed:
+            # Show the whole-percent grid (100x fewer cells, so near instant) while the fine grid is calculated
+            coarse_df = default_cache.get_frame(*parameters[:5])
+            view.render_preview(job, lambda: view.show_heatmap(coarse_df, *color_limits(coarse_df)), timing=timing)
+            if job.cancelled:
+                return None
+
+        # Look up (or recalculate in one vectorized pass) the dataset
+        with timing.span("compute"):
+            df = default_cache.get_frame(*parameters)
+        if job.cancelled:
+            return None
+
+        # Update the heatmap in place (the figure is only built the first time this tab generates one), with a
+        # coarse preview first for grids much larger than the plot (unless the whole-percent grid was just shown)
+        vmin, vmax = color_limits(df)
+        if previewed:
+            view.render_offscreen(lambda: view.show_heatmap(df, vmin, vmax), timing)
+        else:
+            view.render_progressive(job, lambda: view.show_heatmap(df, vmin, vmax), df.shape, timing)
+        return df
+
+    # Runs on the Tk thread once the worker is done
+    def on_done(df):
+        from heatmap_cache import grid_key
+
+        # Store the heatmap data for this tab (the comparisons are only invalidated if the grid changed)
+        store_heatmap(tab_name, df, grid_key(damage, mult, base_cooldown, max_cdr - 1, x_range, step))
+
+        with timing.span("present"):
+            view.set_hover(df.values, describe_heatmap_cell(df))
+            view.present()
+        timing.finish()
+        status_label.config(text=timing.summary() if heatmap_timing.enabled else "")
+
+    def on_error(e):
+        status_label.config(text="")
+        error_label.config(text=f"Error: {e}")
+
+    # Hand the work to the background worker so the window stays responsive; this replaces any
+    # generation still running for this tab
+    status_label.config(text="Generating...")
+    heatmap_worker.submit(tab_name, work, on_done, on_error, lambda preview: view.present())
+
+def live_update(tab_name, low_cap_entry, high_cap_entry, max_cdr_entry, cdr_changed):
+    """
+    Apply slider changes to the heatmap already shown in a tab, without regenerating it.
+    Cap changes only re-normalise the colors; Maximum CDR changes add or drop rows of the existing grid.
+    Returns False if the tab is busy (a generation is in flight) and the update should be retried.
+    """
+    view = heatmap_views.get(tab_name)
+    if view is None or tab_name not in heatmap_data:
+        return True  # Nothing generated yet, so nothing to update
+    if heatmap_worker.is_busy(tab_name) or not view.canvas.render_lock.acquire(blocking=False):
+        return False
+
+    try:
+        try:
+            low_cap = float(low_cap_entry.get()) if low_cap_entry.get() else None
+            high_cap = float(high_cap_entry.get()) if high_cap_entry.get() else None
+            new_max_cdr = int(max_cdr_entry.get())
+        except ValueError:
+            return True  # Half-typed values; the next slider move will update it
+
+        df = heatmap_data[tab_name]
+        damage, mult, base_cooldown, max_cdr, x_range, step = heatmap_parameters[tab_name]
+        cdr_changed = cdr_changed and 10 <= new_max_cdr <= 100 and new_max_cdr != max_cdr
+        if cdr_changed:
+            import pandas as pd
+            from heatmap_cache import default_cache, grid_key
+            from heatmap_compute import cdr_axis, change_max_cdr
+
+            # Only the rows above the old maximum are calculated, lowering it just drops rows. The grid goes into
+            # the cache too, so comparisons against it don't recompute it from scratch
+            grid = change_max_cdr(df.values, damage, mult, base_cooldown, max_cdr, new_max_cdr, x_range, step)
+            grid = default_cache.put_grid(grid, damage, mult, base_cooldown, new_max_cdr, x_range, step)
+            df = pd.DataFrame(grid, columns=df.columns, index=cdr_axis(new_max_cdr, step))
+            store_heatmap(tab_name, df, grid_key(damage, mult, base_cooldown, new_max_cdr, x_range, step))
+
+        vmin = low_cap if low_cap is not None else df.values.min()
+        vmax = high_cap if high_cap is not None else df.values.max()
+        if cdr_changed:
+            view.show_heatmap(df, vmin, vmax)
+            view.set_hover(df.values, describe_heatmap_cell(df))
         else:
-            current_canvas[tab_name].get_tk_widget().destroy()
-        current_canvas[tab_name] = None
-    # Delete the text element (cursor information label) if it exists
-    for widget in plot_frame.winfo_children():
-        if isinstance(widget, ttk.Label):  # Check if the widget is a label
-            widget.destroy()
+            view.set_color_limits(vmin, vmax)  # No recompute, only the colors change
+    finally:
+        view.canvas.render_lock.release()
+
+    view.draw()
+    return True
 
 def update_field_from_slider(slider_value, entry_field):
     """
@@ -367,10 +632,7 @@ def save_preset(name, damage, mult, base_cooldown, low_cap, high_cap, max_cdr):
     except sqlite3.IntegrityError:
         pass
 
-def create_tab(notebook, tab_name):
-    tab = ttk.Frame(notebook)
-    notebook.add(tab, text=tab_name)
-
+def create_tab(tab, tab_name):
     frame = ttk.Frame(tab, padding="10")
     frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
 
@@ -381,29 +643,27 @@ def create_tab(notebook, tab_name):
     preset_dropdown = ttk.Combobox(frame, textvariable=preset_var, state="readonly", width=30)
     preset_dropdown.grid(row=0, column=1, sticky=(tk.W, tk.E))
 
-    # Load presets from the database
+    # Load presets from the database (read once per session and shared by every tab)
     presets = fetch_all_presets()
     preset_dropdown['values'] = [preset[1] for preset in presets]  # Use preset names
 
     # Function to apply a selected preset
     def apply_preset(event):
-        selected_preset = preset_var.get()
-        for preset in presets:
-            if preset[1] == selected_preset:
-                _, _, damage, mult, base_cooldown, low_cap, high_cap, max_cdr = preset
-                damage_entry.delete(0, tk.END)
-                damage_entry.insert(0, damage)
-                mult_entry.delete(0, tk.END)
-                mult_entry.insert(0, mult)
-                base_cooldown_entry.delete(0, tk.END)
-                base_cooldown_entry.insert(0, base_cooldown)
-                low_cap_entry.delete(0, tk.END)
-                low_cap_entry.insert(0, low_cap)
-                high_cap_entry.delete(0, tk.END)
-                high_cap_entry.insert(0, high_cap)
-                max_cdr_entry.delete(0, tk.END)
-                max_cdr_entry.insert(0, max_cdr)
-                break
+        preset = fetch_preset(preset_var.get())  # Indexed lookup by name
+        if preset is not None:
+            _, _, damage, mult, base_cooldown, low_cap, high_cap, max_cdr = preset
+            damage_entry.delete(0, tk.END)
+            damage_entry.insert(0, damage)
+            mult_entry.delete(0, tk.END)
+            mult_entry.insert(0, mult)
+            base_cooldown_entry.delete(0, tk.END)
+            base_cooldown_entry.insert(0, base_cooldown)
+            low_cap_entry.delete(0, tk.END)
+            low_cap_entry.insert(0, low_cap)
+            high_cap_entry.delete(0, tk.END)
+            high_cap_entry.insert(0, high_cap)
+            max_cdr_entry.delete(0, tk.END)
+            max_cdr_entry.insert(0, max_cdr)
 
     preset_dropdown.bind("<<ComboboxSelected>>", apply_preset)
 
@@ -431,7 +691,7 @@ def create_tab(notebook, tab_name):
         orient=tk.HORIZONTAL,
         resolution=0.1,  # Slider steps
         length=300,  # Make the slider three times as long
-        command=lambda value: [update_field_from_slider(float(value), low_cap_entry)]
+        command=lambda value: [update_field_from_slider(float(value), low_cap_entry), schedule_live_update()]
     )
     low_cap_slider.grid(row=4, column=2, sticky=tk.W)
 
@@ -447,7 +707,7 @@ def create_tab(notebook, tab_name):
         orient=tk.HORIZONTAL,
         resolution=0.1,  # Slider steps
         length=300,  # Make the slider three times as long
-        command=lambda value: [update_field_from_slider(float(value), high_cap_entry)]
+        command=lambda value: [update_field_from_slider(float(value), high_cap_entry), schedule_live_update()]
     )
     high_cap_slider.grid(row=5, column=2, sticky=tk.W)
 
@@ -462,7 +722,7 @@ def create_tab(notebook, tab_name):
         orient=tk.HORIZONTAL,
         resolution=1,  # Slider steps
         length=300,  # Make the slider three times as long
-        command=lambda value: max_cdr_entry.delete(0, tk.END) or max_cdr_entry.insert(0, value)
+        command=lambda value: [max_cdr_entry.delete(0, tk.END), max_cdr_entry.insert(0, value), schedule_live_update(True)]
     )
     max_cdr_slider.grid(row=6, column=2)
 
@@ -472,18 +732,49 @@ def create_tab(notebook, tab_name):
     # Add a checkbox for "end at storm"
     end_at_rope_var = tk.BooleanVar(value=False)  # Default to full x-axis
     end_at_rope_checkbox = ttk.Checkbutton(frame, text="End at storm", variable=end_at_rope_var)
-    end_at_rope_checkbox.grid(row=8, column=0, columnspan=3, sticky=tk.W)
+    end_at_rope_checkbox.grid(row=8, column=0, sticky=tk.W)
+
+    # Add a checkbox for a finer grid (0.1 s and 0.1% CDR steps)
+    fine_grid_var = tk.BooleanVar(value=False)  # Default to whole seconds and percents
+    fine_grid_checkbox = ttk.Checkbutton(frame, text="Fine grid", variable=fine_grid_var)
+    fine_grid_checkbox.grid(row=8, column=1, sticky=tk.W)
+
+    # Add a checkbox for live mode: dragging the sliders updates the heatmap without clicking "Generate Heatmap"
+    live_var = tk.BooleanVar(value=False)
+    live_checkbox = ttk.Checkbutton(frame, text="Live update", variable=live_var)
+    live_checkbox.grid(row=8, column=2, sticky=tk.W)
+
+    # Slider changes are coalesced and applied at most once per frame (~60 per second)
+    pending_live_update = {"id": None, "cdr_changed": False}
+
+    def schedule_live_update(cdr_changed=False):
+        if not live_var.get():
+            return
+        pending_live_update["cdr_changed"] = pending_live_update["cdr_changed"] or cdr_changed
+        if pending_live_update["id"] is None:
+            pending_live_update["id"] = tab.after(16, run_live_update)
+
+    def run_live_update():
+        cdr_changed = pending_live_update["cdr_changed"]
+        pending_live_update["id"] = None
+        pending_live_update["cdr_changed"] = False
+        if not live_update(tab_name, low_cap_entry, high_cap_entry, max_cdr_entry, cdr_changed):
+            schedule_live_update(cdr_changed)  # Busy generating, try again on the next frame
 
     generate_button = ttk.Button(
         frame,
         text="Generate Heatmap",
         command=lambda: generate_heatmap(
             damage_entry, mult_entry, base_cooldown_entry, error_label,
-            plot_frame, tab_name, low_cap_entry, high_cap_entry, end_at_rope_var, max_cdr_entry
+            plot_frame, tab_name, low_cap_entry, high_cap_entry, end_at_rope_var, max_cdr_entry, fine_grid_var, status_label
         ),
     )
     generate_button.grid(row=9, column=0, sticky=tk.W)
 
+    # Label showing whether the heatmap is still being generated
+    status_label = ttk.Label(frame, text="")
+    status_label.grid(row=9, column=1, sticky=tk.W)
+
     # Frame for displaying the heatmap
     plot_frame = ttk.Frame(tab, padding="10")
     plot_frame.grid(row=10, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
@@ -494,27 +785,63 @@ def create_tab(notebook, tab_name):
 
     return tab
 
-# Create the GUI
-root = tk.Tk()
-root.title("Bazaar Data Visualizer")
+def main():
+    global heatmap_worker
+
+    initialize_database()
+
+    with startup_timing.span("build window"):
+        # Create the GUI
+        root = tk.Tk()
+        root.title("Bazaar Data Visualizer")
+        heatmap_worker = HeatmapWorker(root)
+
+        # Set the initial window size
+        root.geometry("1000x900")  # Width: 1000px, Height: 900px
+
+        # Configure resizing behavior for the root window
+        root.rowconfigure(0, weight=1)  # Allow row 0 to expand
+        root.columnconfigure(0, weight=1)  # Allow column 0 to expand
+
+        notebook = ttk.Notebook(root)
+        notebook.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+
+        # Configure resizing behavior for the notebook
+        notebook.rowconfigure(0, weight=1)  # Allow row 0 to expand
+        notebook.columnconfigure(0, weight=1)  # Allow column 0 to expand
+
+        # Create two independent tabs, plus the comparison and best item tabs. Only the selected tab is
+        # built now, the others are built the first time they are opened
+        add_deferred_tab(notebook, "Weapon 1", lambda tab: create_tab(tab, "Weapon 1"))
+        add_deferred_tab(notebook, "Weapon 2", lambda tab: create_tab(tab, "Weapon 2"))
+        add_deferred_tab(notebook, "Comparison Tab", create_comparison_tab)
+        add_deferred_tab(notebook, "Best Item Tab", create_ranking_tab)
+        if sweep_cube_path is not None:
+            add_deferred_tab(notebook, "Sweep Tab", create_sweep_tab)
+        notebook.bind("<<NotebookTabChanged>>", lambda event: build_selected_tab(notebook))
+        build_selected_tab(notebook)
+
+    # Once the window is up, report how long that took and start loading the heavy modules
+    def on_shown():
+        startup_timing.finish()
+        if heatmap_timing.enabled:
+            print(f"Startup: {startup_timing.summary()}")
+        heatmap_worker.submit("Preload", preload_modules, lambda result: None)
 
-# Set the initial window size
-root.geometry("1000x900")  # Width: 1000px, Height: 900px
+    root.after_idle(on_shown)
 
-# Configure resizing behavior for the root window
-root.rowconfigure(0, weight=1)  # Allow row 0 to expand
-root.columnconfigure(0, weight=1)  # Allow column 0 to expand
+    # Ctrl+Shift+T writes the spans recorded so far as a Chrome trace (when stage timing is enabled)
+    def export_trace(event=None):
+        path = heatmap_timing.trace_path or "heatmap_trace.json"
+        print(f"Wrote {heatmap_timing.export_trace(path)} timing spans to {path}")
 
-notebook = ttk.Notebook(root)
-notebook.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+    if heatmap_timing.enabled:
+        root.bind_all("<Control-T>", export_trace)
 
-# Configure resizing behavior for the notebook
-notebook.rowconfigure(0, weight=1)  # Allow row 0 to expand
-notebook.columnconfigure(0, weight=1)  # Allow column 0 to expand
+    root.mainloop()
 
-# Create two independent tabs
-create_tab(notebook, "Weapon 1")
-create_tab(notebook, "Weapon 2")
-create_comparison_tab(notebook)
+    if heatmap_timing.trace_path:
+        export_trace()
 
-root.mainloop()
+if __name__ == "__main__":
+    main()
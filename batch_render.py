@@ -0,0 +1,138 @@
+import argparse
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+
+import pandas as pd
+
+from heatmap_cache import default_cache
+from heatmap_compute import relative_difference
+from heatmap_render import HeatmapPlot, create_figure
+from preset_database import fetch_all_presets
+
+def preset_filename(name):
+    """Turn a preset name like 'Fang (Bronze)' into a filesystem friendly 'Fang_Bronze'."""
+    return re.sub(r"[^A-Za-z0-9]+", "_", name).strip("_")
+
+def parse_cap(value):
+    """Presets store blank caps as empty strings; treat those as automatic fit."""
+    return float(value) if value not in ("", None) else None
+
+# Each worker process (or the heatmap service's render thread) keeps one plot per kind of heatmap and updates it in
+# place between tasks
+worker_plots = {}
+
+def get_worker_plot(kind):
+    if kind not in worker_plots:
+        worker_plots[kind] = HeatmapPlot(create_figure(10))
+    return worker_plots[kind]
+
+def render_preset(task):
+    """Compute and write the heatmap for a single preset. Runs inside a worker process."""
+    preset, output_dir, x_range, step, formats = task
+    _, name, damage, mult, base_cooldown, low_cap, high_cap, max_cdr = preset
+    df = default_cache.get_frame(damage, mult, base_cooldown, max_cdr, x_range, step)
+    low_cap = parse_cap(low_cap)
+    high_cap = parse_cap(high_cap)
+
+    base_path = os.path.join(output_dir, preset_filename(name))
+    written = []
+    if "csv" in formats:
+        df.to_csv(base_path + ".csv")
+        written.append(base_path + ".csv")
+    if "png" in formats:
+        vmin = low_cap if low_cap is not None else df.values.min()
+        vmax = high_cap if high_cap is not None else df.values.max()
+        plot = get_worker_plot("heatmap")
+        plot.show_heatmap(df, vmin, vmax)
+        plot.ax.set_title(name)
+        plot.fig.savefig(base_path + ".png", bbox_inches="tight")
+        written.append(base_path + ".png")
+    return written
+
+def render_comparison(task):
+    """
+    Compute and write the comparison heatmap for a pair of presets. Runs inside a worker process.
+    Both heatmaps are computed up to the larger of the two presets' Maximum CDR so their dimensions match.
+    """
+    preset1, preset2, output_dir, x_range, step, formats, absolute_damage = task
+    max_cdr = max(preset1[7], preset2[7])
+    # Each preset shows up in many pairs, so reuse its grid from the worker's cache
+    df1 = default_cache.get_frame(*preset1[2:5], max_cdr, x_range, step)
+    df2 = default_cache.get_frame(*preset2[2:5], max_cdr, x_range, step)
+
+    if absolute_damage:
+        comparison_df = df1.astype("float64") - df2
+    else:
+        comparison, _, _ = relative_difference(df1.values, df2.values)
+        comparison_df = pd.DataFrame(comparison, index=df1.index, columns=df1.columns)
+
+    base_path = os.path.join(output_dir, f"{preset_filename(preset1[1])}_vs_{preset_filename(preset2[1])}")
+    written = []
+    if "csv" in formats:
+        comparison_df.to_csv(base_path + ".csv")
+        written.append(base_path + ".csv")
+    if "png" in formats:
+        plot = get_worker_plot("comparison")
+        plot.show_comparison(comparison_df, absolute_damage)
+        plot.ax.set_title(f"{preset1[1]} vs {preset2[1]}")
+        plot.fig.savefig(base_path + ".png", bbox_inches="tight")
+        written.append(base_path + ".png")
+    return written
+
+def render_all_presets(output_dir, end_at_storm=False, fine_grid=False, absolute_damage=False,
+                       formats=("png", "csv"), comparisons=True, workers=None):
+    """
+    Render the heatmap of every preset in presets.db, plus a comparison heatmap for every pair of presets.
+    Work is spread over a process pool (one process per core by default). Returns the list of written files.
+    """
+    presets = fetch_all_presets()
+    x_range = 30 if end_at_storm else 60
+    step = 0.1 if fine_grid else 1
+    os.makedirs(output_dir, exist_ok=True)
+
+    preset_tasks = [(preset, output_dir, x_range, step, formats) for preset in presets]
+    comparison_tasks = []
+    if comparisons:
+        comparison_tasks = [
+            (preset1, preset2, output_dir, x_range, step, formats, absolute_damage)
+            for preset1, preset2 in combinations(presets, 2)
+        ]
+
+    # Hand out work in chunks so process round trips don't dominate for large catalogues
+    worker_count = workers or os.cpu_count() or 1
+    chunksize = max(1, len(comparison_tasks) // (worker_count * 4))
+
+    written = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for paths in executor.map(render_preset, preset_tasks):
+            written.extend(paths)
+        for paths in executor.map(render_comparison, comparison_tasks, chunksize=chunksize):
+            written.extend(paths)
+    return written
+
+def main():
+    parser = argparse.ArgumentParser(description="Render heatmaps for every preset in presets.db without the GUI.")
+    parser.add_argument("output_dir", help="Directory to write the PNG/CSV files to")
+    parser.add_argument("--end-at-storm", action="store_true", help="Limit the x-axis to 30 seconds")
+    parser.add_argument("--fine-grid", action="store_true", help="Use 0.1 s and 0.1%% CDR steps")
+    parser.add_argument("--absolute-damage", action="store_true", help="Compare absolute instead of relative damage")
+    parser.add_argument("--format", dest="formats", nargs="+", choices=["png", "csv"], default=["png", "csv"])
+    parser.add_argument("--no-comparisons", action="store_true", help="Only render single item heatmaps")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes (default: all cores)")
+    args = parser.parse_args()
+
+    written = render_all_presets(
+        args.output_dir,
+        end_at_storm=args.end_at_storm,
+        fine_grid=args.fine_grid,
+        absolute_damage=args.absolute_damage,
+        formats=args.formats,
+        comparisons=not args.no_comparisons,
+        workers=args.workers
+    )
+    print(f"Wrote {len(written)} files to {args.output_dir}")
+
+if __name__ == "__main__":
+    main()
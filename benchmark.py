@@ -0,0 +1,302 @@
+"""
+Benchmarks for the hot paths of the visualizer: grid build, comparisons, off-screen rendering, hover lookups
+preset loading and startup. Runs headless and prints the results as JSON; with --baseline, every stage is compared
+against a stored run and the exit code is 1 if any of them regressed.
+
+    python benchmark.py --baseline benchmark_baseline.json
+    python benchmark.py --save-baseline benchmark_baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import matplotlib
+matplotlib.use("Agg")  # Headless: never open a window
+
+import numpy as np
+import pandas as pd
+
+import preset_database
+from heatmap_cache import HeatmapCache
+from heatmap_compute import relative_difference
+from heatmap_render import HeatmapPlot, create_figure
+
+# Grid sizes to build, as (label, max_cdr, x_range, step)
+GRID_SIZES = [
+    ("coarse_50x30", 50, 30, 1),
+    ("coarse_100x60", 100, 60, 1),
+    ("fine_50x30", 50, 30, 0.1),
+    ("fine_100x60", 100, 60, 0.1),
+]
+
+# Two items to compare (damage, mult, base_cooldown), like Fang vs Brass Knuckles in the README
+WEAPON_1 = (8, 1, 3)
+WEAPON_2 = (22, 1, 8)
+
+LOD_SIZE = (385, 775)  # Pixel size (rows, columns) of the heatmap axes in a 1000x900 window
+HOVER_LOOKUPS = 1000  # Simulated mouse positions per hover measurement
+PRESET_ROWS = 10000  # Size of the scaled-up presets.db
+
+MIN_TIMING = 0.01  # Seconds; cheaper benchmarks are called several times per timing, like timeit
+
+def measure(function, repeats, setup=None):
+    """
+    Time function() repeats times and summarise the timings (in seconds per call).
+    If setup is given it runs (untimed) before every call; otherwise cheap functions are called in a loop
+    until a timing takes at least MIN_TIMING, so the timer resolution doesn't dominate.
+    """
+    number = 1
+    while setup is None:
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        if time.perf_counter() - start >= MIN_TIMING:
+            break
+        number *= 10
+
+    timings = []
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        timings.append((time.perf_counter() - start) / number)
+    return {"median": statistics.median(timings), "min": min(timings), "repeats": repeats, "number": number}
+
+def grid_stages(repeats):
+    results = {}
+    for label, max_cdr, x_range, step in GRID_SIZES:
+        # Same call as generate_heatmap, on an empty cache so the grid is actually computed
+        results[f"grid_build[{label}]"] = measure(
+            lambda: HeatmapCache().get_frame(*WEAPON_1, max_cdr, x_range, step), repeats
+        )
+    return results
+
+def comparison_stages(repeats):
+    results = {}
+    for label, max_cdr, x_range, step in GRID_SIZES:
+        df1 = HeatmapCache().get_frame(*WEAPON_1, max_cdr, x_range, step)
+        df2 = HeatmapCache().get_frame(*WEAPON_2, max_cdr, x_range, step)
+
+        # The two paths of generate_comparison_heatmap
+        def relative():
+            comparison, _, _ = relative_difference(df1.values, df2.values)
+            pd.DataFrame(comparison, index=df1.index, columns=df1.columns)
+
+        results[f"comparison_relative[{label}]"] = measure(relative, repeats)
+        results[f"comparison_absolute[{label}]"] = measure(lambda: df1.astype("float64") - df2, repeats)
+    return results
+
+def render_stages(repeats):
+    results = {}
+    for label, max_cdr, x_range, step in (GRID_SIZES[1], GRID_SIZES[3]):
+        df1 = HeatmapCache().get_frame(*WEAPON_1, max_cdr, x_range, step)
+        df2 = HeatmapCache().get_frame(*WEAPON_2, max_cdr, x_range, step)
+        comparison, _, _ = relative_difference(df1.values, df2.values)
+        comparison_df = pd.DataFrame(comparison, index=df1.index, columns=df1.columns)
+
+        def first_render():
+            # A tab's first heatmap: seaborn builds the figure
+            plot = HeatmapPlot(create_figure(10))
+            plot.show_heatmap(df1, df1.values.min(), df1.values.max())
+            plot.fig.canvas.draw()
+
+        plot = HeatmapPlot(create_figure(10))
+        plot.show_heatmap(df1, df1.values.min(), df1.values.max())
+        plot.fig.canvas.draw()
+        shown = [df1, df2]
+
+        def update_render():
+            # Every later heatmap: the existing mesh is updated in place
+            shown.reverse()
+            plot.show_heatmap(shown[0], shown[0].values.min(), shown[0].values.max())
+            plot.fig.canvas.draw()
+
+        comparison_plot = HeatmapPlot(create_figure(10))
+        comparison_plot.show_comparison(comparison_df, False)  # Built by seaborn once, like the comparison tab
+
+        def comparison_render():
+            comparison_plot.show_comparison(comparison_df, False)
+            comparison_plot.fig.canvas.draw()
+
+        lod_plot = HeatmapPlot(create_figure(10))
+        lod_plot.lod = "extremes"
+        lod_plot.lod_size = LOD_SIZE
+
+        def lod_render():
+            # Level of detail rendering, as the GUI does for grids larger than the plot
+            lod_plot.show_heatmap(df1, df1.values.min(), df1.values.max())
+            lod_plot.fig.canvas.draw()
+
+        lod_render()  # Build the figure once, like update_render
+        results[f"render_first[{label}]"] = measure(first_render, repeats)
+        results[f"render_update[{label}]"] = measure(update_render, repeats)
+        results[f"render_comparison[{label}]"] = measure(comparison_render, repeats)
+        results[f"render_lod[{label}]"] = measure(lod_render, repeats)
+    return results
+
+def hover_stages(repeats):
+    from BazaarHeatmap import describe_heatmap_cell
+
+    results = {}
+    for label, max_cdr, x_range, step in (GRID_SIZES[1], GRID_SIZES[3]):
+        df = HeatmapCache().get_frame(*WEAPON_1, max_cdr, x_range, step)
+        plot = HeatmapPlot(create_figure(10))
+        plot.show_heatmap(df, df.values.min(), df.values.max())
+        plot.fig.canvas.draw()
+
+        values = df.values
+        describe_cell = describe_heatmap_cell(df)
+        inverse_transform = plot.ax.transData.inverted()
+        width, height = plot.fig.canvas.get_width_height(physical=True)
+        rng = np.random.default_rng(0)
+        positions = list(zip(rng.integers(0, width, HOVER_LOOKUPS), rng.integers(0, height, HOVER_LOOKUPS)))
+
+        def hover():
+            # The same lookup HeatmapView does for every (coalesced) mouse motion event
+            rows, columns = values.shape
+            for x_pixel, y_pixel in positions:
+                x_data, y_data = inverse_transform.transform((x_pixel, height - y_pixel))
+                column = int(np.floor(x_data))
+                row = int(np.floor(y_data))
+                if 0 <= column < columns and 0 <= row < rows:
+                    describe_cell(row, column, values[row, column])
+
+        results[f"hover_lookup_x{HOVER_LOOKUPS}[{label}]"] = measure(hover, repeats)
+    return results
+
+def preset_stages(repeats):
+    results = {}
+    temp_dir = tempfile.mkdtemp()
+    try:
+        # Scale a copy of presets.db up to PRESET_ROWS presets, leaving the real one untouched
+        path = os.path.join(temp_dir, "presets.db")
+        shutil.copyfile(preset_database.get_resource_path("presets.db"), path)
+        preset_database.set_database_path(path)
+        conn = preset_database.get_connection()
+        existing = len(preset_database.fetch_all_presets())
+        rows = [
+            (f"Benchmark Item {i}", 5 + i % 20, 1 + i % 3, 3 + i % 8, "", "", 50)
+            for i in range(max(0, PRESET_ROWS - existing))
+        ]
+        with conn:
+            conn.executemany("""
+                INSERT INTO presets (name, damage, mult, base_cooldown, low_cap, high_cap, max_cdr)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+        preset_database.invalidate_cache()
+        names = [preset[1] for preset in preset_database.fetch_all_presets()[::max(1, PRESET_ROWS // 1000)]]
+
+        results["presets_fetch_all_cold"] = measure(
+            preset_database.fetch_all_presets, repeats, setup=preset_database.invalidate_cache
+        )
+        results["presets_fetch_all_warm"] = measure(preset_database.fetch_all_presets, repeats)
+        results[f"presets_fetch_by_name_x{len(names)}"] = measure(
+            lambda: [preset_database.fetch_preset(name) for name in names], repeats
+        )
+    finally:
+        preset_database.set_database_path(None)
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return results
+
+def startup_stages(repeats):
+    # Fresh interpreter importing the GUI module, i.e everything before the window can be created
+    # (creating the window itself needs a display)
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    command = [sys.executable, "-c", "import BazaarHeatmap"]
+    return {"startup_import": measure(lambda: subprocess.run(command, cwd=script_dir, check=True), repeats)}
+
+def calibration_workload():
+    # Fixed mix of interpreter and NumPy work, used to factor out the speed of the machine
+    total = 0
+    for i in range(20000):
+        total += i % 7
+    np.sort(np.random.default_rng(0).random(20000))
+
+STAGES = {
+    "grid": grid_stages,
+    "comparison": comparison_stages,
+    "render": render_stages,
+    "hover": hover_stages,
+    "presets": preset_stages,
+    "startup": startup_stages,
+}
+
+def run_benchmarks(stages, repeats):
+    # Calibrate before and after, keeping the faster, in case the machine got busier part way through
+    calibration = measure(calibration_workload, repeats)["min"]
+    results = {}
+    for stage in stages:
+        results.update(STAGES[stage](repeats))
+    calibration = min(calibration, measure(calibration_workload, repeats)["min"])
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "matplotlib": matplotlib.__version__,
+        "platform": platform.platform(),
+        "repeats": repeats,
+        "calibration": calibration,
+        "results": results,
+    }
+
+def compare_to_baseline(run, baseline, threshold):
+    """
+    Compare the fastest timing of every benchmark to the baseline's (the minimum is the least affected by
+    other load on the machine), after scaling both by their run's calibration time so that baselines
+    recorded on a faster or slower machine still apply. Returns the names of the benchmarks that got
+    slower than threshold times the baseline (benchmarks missing from either run are skipped).
+    """
+    regressions = []
+    for name, result in run["results"].items():
+        reference = baseline["results"].get(name)
+        if reference is None:
+            continue
+        ratio = (result["min"] / run["calibration"]) / (reference["min"] / baseline["calibration"])
+        status = "REGRESSION" if ratio > threshold else "ok"
+        if ratio > threshold:
+            regressions.append(name)
+        print(f"{name:45} {reference['min'] * 1000:10.4f} ms -> {result['min'] * 1000:10.4f} ms  "
+              f"({ratio:.2f}x) {status}", file=sys.stderr)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the visualizer's hot paths (headless).")
+    parser.add_argument("--stage", action="append", choices=list(STAGES), help="Only run these stages (default: all)")
+    parser.add_argument("--repeats", type=int, default=7, help="Timed runs per benchmark (the median is reported)")
+    parser.add_argument("--output", help="Write the results JSON here instead of to stdout")
+    parser.add_argument("--baseline", help="Baseline JSON to compare against; exits with 1 on a regression")
+    parser.add_argument("--threshold", type=float, default=2.0, help="Slowdown (ratio of fastest timings) that counts as a regression")
+    parser.add_argument("--save-baseline", help="Write the results as a new baseline JSON")
+    args = parser.parse_args()
+
+    run = run_benchmarks(args.stage or list(STAGES), args.repeats)
+
+    output = json.dumps(run, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as file:
+            file.write(output + "\n")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+        regressions = compare_to_baseline(run, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} benchmark(s) regressed: {', '.join(regressions)}", file=sys.stderr)
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+import argparse
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from heatmap_compute import calculate_rows
+
+BOARD_SLOTS = 10  # A full board is 10 slots; small, medium and large items take 1, 2 and 3
+OBJECTIVES = ("mean", "robust")
+
+def item_values(presets, cdr, durations):
+    """
+    Expected damage of every preset (rows) for every fight duration (columns) at the given CDR,
+    with the same formula as calculate_value. presets are rows of the presets table.
+    """
+    return np.vstack([
+        calculate_rows(preset[2], preset[3], preset[4], [cdr], durations)[0] for preset in presets
+    ])
+
+def knapsack(scores, sizes, slots):
+    """
+    0/1 knapsack by dynamic programming: the set of items with the highest total score that fits in slots.
+    Returns (chosen item indices, total score).
+    """
+    best = np.zeros(slots + 1)  # best[c]: highest total score using at most c slots
+    taken = np.zeros((len(scores), slots + 1), dtype=bool)
+    for i, (score, size) in enumerate(zip(scores, sizes)):
+        if size > slots:
+            continue
+        candidate = np.full(slots + 1, -np.inf)
+        candidate[size:] = best[:slots + 1 - size] + score
+        taken[i] = candidate > best
+        best = np.where(taken[i], candidate, best)
+
+    chosen = []
+    capacity = slots
+    for i in range(len(scores) - 1, -1, -1):
+        if taken[i, capacity]:
+            chosen.append(i)
+            capacity -= sizes[i]
+    return chosen[::-1], best[slots]
+
+def suffix_bounds(values, sizes, slots):
+    """
+    bounds[i, :, c]: the highest total of each column achievable with items i onwards in c slots,
+    with every column optimised on its own (a knapsack per column).
+    """
+    items, columns = values.shape
+    bounds = np.zeros((items + 1, columns, slots + 1))
+    for i in range(items - 1, -1, -1):
+        bounds[i] = bounds[i + 1]
+        size = sizes[i]
+        if size <= slots:
+            bounds[i, :, size:] = np.maximum(bounds[i + 1, :, size:], bounds[i + 1, :, :slots + 1 - size] + values[i][:, np.newaxis])
+    return bounds
+
+def bound_weights(columns):
+    """
+    Weightings of the columns used to bound the lowest column total: each column on its own, all columns
+    equally, and every pair of columns half and half. The lowest column total never exceeds a weighted
+    average of the columns, so each weighting gives a bound; mixtures are much tighter than single columns
+    when the best board has to balance short and long fights.
+    """
+    pairs = [(a, b) for a in range(columns) for b in range(a + 1, columns)]
+    weights = np.zeros((columns + 1 + len(pairs), columns))
+    weights[:columns] = np.eye(columns)
+    weights[columns] = 1 / columns
+    for k, (a, b) in enumerate(pairs, columns + 1):
+        weights[k, [a, b]] = 0.5
+    return weights
+
+def undominated_items(values, sizes, slots):
+    """
+    Indices of the items worth searching. An item is dropped if more items dominate it (no bigger, at least as
+    much in every column) than could share a board with it: any board using it could swap it for a
+    dominating item that isn't on the board, without getting worse.
+    """
+    items = len(sizes)
+    keep = []
+    for j in range(items):
+        dominates = (values >= values[j]).all(axis=1) & (sizes <= sizes[j])
+        # Break ties between identical items by index, so two equal items can't both be dropped for each other
+        dominates &= (values > values[j]).any(axis=1) | (sizes < sizes[j]) | (np.arange(items) < j)
+        if dominates.sum() <= slots - sizes[j]:
+            keep.append(j)
+    return np.array(keep, dtype=int)
+
+def improve_board(values, sizes, slots, chosen):
+    """
+    Local search from a board (list of item indices): repeatedly make the single change (adding an item, or
+    swapping one for another) that raises the lowest column total the most, until no change helps.
+    Returns (chosen item indices, lowest column total).
+    """
+    chosen = list(chosen)
+    totals = values[chosen].sum(axis=0) if chosen else np.zeros(values.shape[1])
+    score = totals.min()
+    while True:
+        free = slots - sizes[chosen].sum()
+        best_score, removed, added = score, None, None
+        for candidate_removed in [None] + chosen:
+            base = totals if candidate_removed is None else totals - values[candidate_removed]
+            room = free if candidate_removed is None else free + sizes[candidate_removed]
+            fits = sizes <= room
+            fits[chosen] = False
+            if not fits.any():
+                continue
+            scores = np.where(fits, (base + values).min(axis=1), -np.inf)
+            j = int(scores.argmax())
+            if scores[j] > best_score:
+                best_score, removed, added = scores[j], candidate_removed, j
+        if added is None:
+            return chosen, score
+        if removed is not None:
+            chosen.remove(removed)
+            totals = totals - values[removed]
+        chosen.append(added)
+        totals = totals + values[added]
+        score = best_score
+
+# Search state of the worker processes, set once per process by _init_search
+_search = None
+
+def _init_search(weighted_values, sizes, bounds, columns, shared_incumbent=None):
+    global _search
+    _search = (weighted_values, sizes, bounds, columns, shared_incumbent)
+
+def _branch_and_bound(start, incumbent):
+    """
+    Depth-first search for the subset maximising the minimum column total, starting from a partial board
+    start = (next item, free slots, weighted totals, chosen items). Branches whose bound can't beat the
+    incumbent score are pruned. Returns (best score, chosen items), or (incumbent, None) if nothing beat it.
+    When searching in parallel, the incumbent is shared so every process prunes with the best board found.
+    """
+    weighted_values, sizes, bounds, columns, shared_incumbent = _search
+    items = len(sizes)
+    best_choice = None
+    stack = [start]
+    nodes = 0
+    while stack:
+        i, free, totals, chosen = stack.pop()
+        nodes += 1
+        if shared_incumbent is not None and nodes % 256 == 0:
+            incumbent = max(incumbent, shared_incumbent.get_obj().value)  # Lock-free read, only updates take the lock
+        if (totals + bounds[i, :, free]).min() <= incumbent:
+            continue  # Even the optimistic bound can't beat the best board found so far
+        score = totals[:columns].min()  # The first weightings are the columns themselves
+        if score > incumbent:
+            incumbent, best_choice = score, chosen
+            if shared_incumbent is not None:
+                with shared_incumbent.get_lock():
+                    shared_incumbent.value = max(shared_incumbent.value, score)
+        if i == items or free == 0:
+            continue
+        stack.append((i + 1, free, totals, chosen))  # Skip item i
+        if sizes[i] <= free:
+            stack.append((i + 1, free - sizes[i], totals + weighted_values[i], chosen + (i,)))  # Take item i (explored first)
+    return incumbent, best_choice
+
+def _search_task(task):
+    start, incumbent = task
+    return _branch_and_bound(start, incumbent)
+
+def maximin_board(values, sizes, slots, workers=None, split_depth=6, parallel_threshold=64):
+    """
+    The subset of items (rows of values) fitting in slots that maximises its lowest column total,
+    by branch and bound. Dominated items are dropped first, and the rest are searched in order of their
+    mean value, starting from the best board found by knapsacks and local search as the incumbent.
+    Large searches (at least parallel_threshold items left) are split after the first split_depth decisions
+    and the branches spread over a process pool, sharing the best score found so far.
+    Returns (chosen item indices, score).
+    """
+    sizes = np.asarray(sizes)
+    candidates = undominated_items(values, sizes, slots)
+    order = candidates[np.argsort(-values[candidates].mean(axis=1), kind="stable")]
+    values = values[order]
+    sizes = sizes[order]
+    columns = values.shape[1]
+
+    weights = bound_weights(columns)
+    weighted_values = values @ weights.T
+    bounds = suffix_bounds(weighted_values, sizes, slots)
+
+    # Start from the best of the boards that are optimal for a single weighting, improved by local search,
+    # so that as much as possible is pruned from the start
+    incumbent, best_choice = 0.0, ()
+    for k in range(columns + 1):
+        chosen, score = improve_board(values, sizes, slots, knapsack(weighted_values[:, k], sizes, slots)[0])
+        if score > incumbent:
+            incumbent, best_choice = score, tuple(chosen)
+
+    root = (0, slots, np.zeros(len(weights)), ())
+    if workers is not None and workers > 1 and len(sizes) >= parallel_threshold:
+        # Expand the first split_depth decisions breadth first, then search the branches in parallel,
+        # most promising first
+        frontier = [root]
+        for i in range(min(split_depth, len(sizes))):
+            expanded = []
+            for _, free, totals, chosen in frontier:
+                expanded.append((i + 1, free, totals, chosen))
+                if sizes[i] <= free:
+                    expanded.append((i + 1, free - sizes[i], totals + weighted_values[i], chosen + (i,)))
+            frontier = expanded
+        frontier.sort(key=lambda node: -np.min(node[2] + bounds[node[0], :, node[1]]))
+
+        shared_incumbent = multiprocessing.Value("d", incumbent)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_search,
+                                 initargs=(weighted_values, sizes, bounds, columns, shared_incumbent)) as executor:
+            results = list(executor.map(_search_task, [(start, incumbent) for start in frontier]))
+    else:
+        _init_search(weighted_values, sizes, bounds, columns)
+        results = [_branch_and_bound(root, incumbent)]
+
+    for score, choice in results:
+        if choice is not None and score > incumbent:
+            incumbent, best_choice = score, choice
+    return sorted(int(order[i]) for i in best_choice), float(incumbent)
+
+def optimize_board(presets, cdr, min_duration=20, max_duration=40, sizes=None, slots=BOARD_SLOTS, objective="mean", workers=None):
+    """
+    Pick the presets for a board of slots slots, for a fight lasting between min_duration and max_duration
+    seconds (each whole second equally likely) at the given CDR. sizes gives the slots taken by each preset
+    (default 1).
+
+    "mean" maximises the average total damage over the fight lengths; the damage of a board is the sum of
+    its items', so this is an exact knapsack. "robust" instead picks the board that stays closest to the
+    best possible board for every fight length (maximising the lowest fraction of that best damage), which
+    doesn't add up per item and is solved by branch and bound.
+    Returns (chosen preset rows, score).
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"objective must be one of {', '.join(OBJECTIVES)}.")
+    durations = np.arange(min_duration, max_duration + 1)
+    values = item_values(presets, cdr, durations)
+    sizes = np.ones(len(presets), dtype=int) if sizes is None else np.asarray(sizes, dtype=int)
+
+    if objective == "mean":
+        chosen, score = knapsack(values.mean(axis=1), sizes, slots)
+    else:
+        # Normalise every fight length by the best damage any board reaches at it
+        best = suffix_bounds(values, sizes, slots)[0, :, slots]
+        chosen, score = maximin_board(values / np.where(best > 0, best, 1), sizes, slots, workers)
+    return [presets[i] for i in chosen], score
+
+def main():
+    from preset_database import fetch_all_presets
+
+    parser = argparse.ArgumentParser(description="Find the best board from the presets in presets.db.")
+    parser.add_argument("--cdr", type=float, default=0, help="Expected CDR, in percent")
+    parser.add_argument("--min-duration", type=int, default=20, help="Shortest expected fight, in seconds")
+    parser.add_argument("--max-duration", type=int, default=40, help="Longest expected fight, in seconds")
+    parser.add_argument("--slots", type=int, default=BOARD_SLOTS, help="Board slots available")
+    parser.add_argument("--sizes", help="JSON file mapping preset names to their size in slots (default 1)")
+    parser.add_argument("--preset", action="append", help="Only consider these presets (default: all)")
+    parser.add_argument("--objective", choices=OBJECTIVES, default="mean",
+                        help="mean: most average damage; robust: closest to the best board at every fight length")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes for large robust searches")
+    args = parser.parse_args()
+
+    presets = fetch_all_presets()
+    if args.preset:
+        presets = [preset for preset in presets if preset[1] in args.preset]
+    size_map = {}
+    if args.sizes:
+        with open(args.sizes, encoding="utf-8") as file:
+            size_map = json.load(file)
+    sizes = [size_map.get(preset[1], 1) for preset in presets]
+
+    board, score = optimize_board(presets, args.cdr, args.min_duration, args.max_duration, sizes, args.slots, args.objective, args.workers)
+
+    durations = np.arange(args.min_duration, args.max_duration + 1)
+    for preset in board:
+        damage = calculate_rows(preset[2], preset[3], preset[4], [args.cdr], durations)[0].mean()
+        print(f"{preset[1]:40} {size_map.get(preset[1], 1)} slot(s)  {damage:10.2f} average damage")
+    if args.objective == "mean":
+        print(f"Total: {score:.2f} average damage")
+    else:
+        print(f"Worst fight length: {score:.1%} of the best possible board's damage")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+import argparse
+import heapq
+import json
+import math
+import numpy as np
+import pandas as pd
+
+from heatmap_compute import cdr_axis, duration_axis, net_cooldown
+
+# Seconds between damage-over-time ticks
+POISON_INTERVAL = 1.0
+BURN_INTERVAL = 0.5
+
+# Slack (in seconds) when deciding whether damage landed within a duration
+BOUNDARY_TOLERANCE = 1e-9
+
+# Event kinds, in the order they are handled when they happen at the same time
+POISON_TICK, BURN_TICK, ITEM_FIRE = 0, 1, 2
+
+class TimelineItem:
+    """
+    An item on the board: every cooldown it hits mult times for damage each,
+    and every hit also applies poison and burn stacks.
+    """
+
+    def __init__(self, name, base_cooldown, damage=0, mult=1, poison=0, burn=0):
+        self.name = name
+        self.base_cooldown = base_cooldown
+        self.damage = damage
+        self.mult = mult
+        self.poison = poison
+        self.burn = burn
+
+def charge_schedule(speed_windows):
+    """
+    Turn speed windows [(start, end, speed), ...] (e.g speed 2 for haste, 0.5 for slow, 0 for freeze) into
+    breakpoints of the charge clock: (times, charges, speeds), where charges[i] is how many seconds of cooldown
+    have charged by times[i], and cooldowns charge at speeds[i] until the next breakpoint.
+    Outside the windows cooldowns charge at normal speed. Windows must not overlap.
+    """
+    times, charges, speeds = [0.0], [0.0], [1.0]
+    for start, end, speed in sorted(speed_windows):
+        # Normal speed up to the start of the window, then the window's speed up to its end
+        charges.append(charges[-1] + (start - times[-1]) * speeds[-1])
+        times.append(start)
+        speeds.append(speed)
+        charges.append(charges[-1] + (end - start) * speed)
+        times.append(end)
+        speeds.append(1.0)
+    return np.array(times), np.array(charges), np.array(speeds)
+
+def time_for_charge(schedule, charge):
+    """The time at which the charge clock reaches charge (seconds of cooldown at normal speed)."""
+    times, charges, speeds = schedule
+    i = np.searchsorted(charges, charge, side="right") - 1  # Never lands in a freeze, which adds no charge
+    return times[i] + (charge - charges[i]) / speeds[i]
+
+def simulate_timeline(items, cooldowns, end, speed_windows=()):
+    """
+    Discrete-event simulation of a board up to end seconds, with items firing on the given cooldowns.
+    Item fires and poison/burn ticks are kept in one priority queue and handled in time order.
+    Poison deals its stacks in damage every second and never decays; burn deals its stacks every half
+    second and then loses one stack.
+    Returns the times and amounts of every instance of damage, in time order.
+    """
+    schedule = charge_schedule(speed_windows) if speed_windows else None
+
+    def fire_time(index, count):
+        # Time of the count-th fire of an item (computed from scratch, so rounding errors don't accumulate)
+        charge = count * cooldowns[index]
+        return charge if schedule is None else time_for_charge(schedule, charge)
+
+    events = []  # (time, kind, item index, fire count)
+    for index in range(len(items)):
+        time = fire_time(index, 1)
+        if time <= end:
+            events.append((time, ITEM_FIRE, index, 1))
+    heapq.heapify(events)
+
+    poison = burn = 0
+    poison_ticking = burn_ticking = False
+    damage_times = []
+    damage_amounts = []
+
+    while events:
+        time, kind, index, count = heapq.heappop(events)
+
+        if kind == ITEM_FIRE:
+            item = items[index]
+            if item.damage:
+                damage_times.append(time)
+                damage_amounts.append(item.damage * item.mult)
+            poison += item.poison * item.mult
+            burn += item.burn * item.mult
+
+            # DoT ticks run on a global clock; start it at the next tick after the first stacks are applied
+            if poison > 0 and not poison_ticking:
+                tick = math.floor(time / POISON_INTERVAL + 1) * POISON_INTERVAL
+                if tick <= end:
+                    heapq.heappush(events, (tick, POISON_TICK, -1, 0))
+                    poison_ticking = True
+            if burn > 0 and not burn_ticking:
+                tick = math.floor(time / BURN_INTERVAL + 1) * BURN_INTERVAL
+                if tick <= end:
+                    heapq.heappush(events, (tick, BURN_TICK, -1, 0))
+                    burn_ticking = True
+
+            next_time = fire_time(index, count + 1)
+            if next_time <= end:
+                heapq.heappush(events, (next_time, ITEM_FIRE, index, count + 1))
+
+        elif kind == POISON_TICK:
+            damage_times.append(time)
+            damage_amounts.append(poison)
+            if time + POISON_INTERVAL <= end:
+                heapq.heappush(events, (time + POISON_INTERVAL, POISON_TICK, -1, 0))
+            else:
+                poison_ticking = False
+
+        else:  # BURN_TICK
+            damage_times.append(time)
+            damage_amounts.append(burn)
+            burn -= 1
+            if burn > 0 and time + BURN_INTERVAL <= end:
+                heapq.heappush(events, (time + BURN_INTERVAL, BURN_TICK, -1, 0))
+            else:
+                burn_ticking = False
+
+    return np.array(damage_times), np.array(damage_amounts, dtype=np.float64)
+
+def damage_curve(damage_times, damage_amounts, durations):
+    """Total damage dealt by each of the durations, read off a single simulated timeline."""
+    cumulative = np.concatenate([[0.0], np.cumsum(damage_amounts)])
+    # Damage landing exactly at the end of a duration counts (like floor(x / net_cooldown)), even if
+    # count * cooldown rounded to just past it
+    return cumulative[np.searchsorted(damage_times, np.asarray(durations) + BOUNDARY_TOLERANCE, side="right")]
+
+def timeline_frame(items, max_cdr, x_range, step=1, speed_windows=()):
+    """
+    Heatmap grid for a whole board, laid out like heatmap_frame: CDR (applied to every item) from max_cdr
+    down to 0 on the rows, combat duration on the columns.
+    Each row is one simulation up to the longest duration, shared by every duration in the row. Rows where
+    every item has hit its minimum cooldown are identical, so their timeline is only simulated once.
+    """
+    cdr_values = cdr_axis(max_cdr, step)
+    durations = duration_axis(x_range, step)
+    grid = np.empty((len(cdr_values), len(durations)))
+    curves = {}
+    for row, cdr in enumerate(cdr_values):
+        cooldowns = tuple(net_cooldown(item.base_cooldown, cdr) for item in items)
+        if cooldowns not in curves:
+            damage_times, damage_amounts = simulate_timeline(items, cooldowns, durations[-1] + BOUNDARY_TOLERANCE, speed_windows)
+            curves[cooldowns] = damage_curve(damage_times, damage_amounts, durations)
+        grid[row] = curves[cooldowns]
+    return pd.DataFrame(grid, index=cdr_values, columns=durations)
+
+def load_board(path):
+    """
+    Read a board from a JSON file: {"items": [{"name", "base_cooldown", "damage", "mult", "poison", "burn"}, ...],
+    "speed_windows": [[start, end, speed], ...]}. Only name and base_cooldown are required for each item.
+    """
+    with open(path, encoding="utf-8") as file:
+        board = json.load(file)
+    items = [TimelineItem(**item) for item in board["items"]]
+    speed_windows = [tuple(window) for window in board.get("speed_windows", [])]
+    return items, speed_windows
+
+def main():
+    parser = argparse.ArgumentParser(description="Heatmap of a whole board's damage, including poison and burn.")
+    parser.add_argument("board", help="JSON file describing the board (see load_board)")
+    parser.add_argument("output", help="PNG file to write the heatmap to")
+    parser.add_argument("--max-cdr", type=float, default=50, help="Highest CDR on the y-axis, in percent")
+    parser.add_argument("--end-at-storm", action="store_true", help="Limit the x-axis to 30 seconds")
+    parser.add_argument("--fine-grid", action="store_true", help="Use 0.1 steps instead of 1")
+    args = parser.parse_args()
+
+    items, speed_windows = load_board(args.board)
+    df = timeline_frame(items, args.max_cdr, 30 if args.end_at_storm else 60, 0.1 if args.fine_grid else 1, speed_windows)
+
+    from heatmap_render import HeatmapPlot, create_figure
+    plot = HeatmapPlot(create_figure(10))
+    plot.show_heatmap(df, df.values.min(), df.values.max())
+    plot.fig.savefig(args.output, bbox_inches="tight")
+    print(f"Wrote {args.output}")
+
+if __name__ == "__main__":
+    main()
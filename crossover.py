@@ -0,0 +1,179 @@
+import argparse
+import math
+
+import numpy as np
+
+from heatmap_compute import net_cooldown
+
+# Items are (damage, mult, base_cooldown), like the first columns of a preset.
+# calculate_value works out to damage * mult * floor(duration / net_cooldown): a staircase that steps up by
+# one hit at every multiple of the net cooldown. Everything below works on those steps directly, so results
+# are exact instead of sampled at the heatmap's grid resolution.
+
+def fire_times(base_cooldown, cdr, end):
+    """Times (in seconds) at which an item fires, up to and including end."""
+    cooldown = net_cooldown(base_cooldown, cdr)
+    return np.arange(1, math.floor(end / cooldown) + 1) * cooldown
+
+def cdr_steps(base_cooldown, duration, max_cdr=100):
+    """
+    CDR values (in percent, up to max_cdr) at which an item gets one more hit in within duration seconds.
+    At k hits the net cooldown must be at most duration / k, which happens from CDR 100 * (1 - duration / (k * base_cooldown)),
+    until CDR reaches the 1 second cooldown cap.
+    """
+    limit = min(100 * (base_cooldown - 1) / base_cooldown, max_cdr)
+    steps = []
+    k = math.floor(duration / base_cooldown) + 1  # Hits at 0% CDR, plus one
+    while True:
+        cdr = 100 * (1 - duration / (k * base_cooldown))
+        if cdr > limit:
+            return steps
+        steps.append(cdr)
+        k += 1
+
+def merge_steps(steps1, steps2, start, end, count1=0, count2=0):
+    """
+    Merge two sorted sequences of positions at which a count goes up by one, in a single pass.
+    Returns segments (low, high, count1, count2) covering [start, end], with both counts constant on [low, high).
+    If a count steps up exactly at end, a final zero-width segment (end, end, ...) holds the counts there.
+    """
+    segments = []
+    i = j = 0
+    low = start
+    while True:
+        # The next position at which either count changes
+        position = min(steps1[i] if i < len(steps1) else math.inf, steps2[j] if j < len(steps2) else math.inf)
+        if position > end:
+            if end > low or not segments or segments[-1][2:] != (count1, count2):
+                segments.append((low, end, count1, count2))
+            return segments
+        if position > low:
+            segments.append((low, position, count1, count2))
+        while i < len(steps1) and steps1[i] == position:
+            count1 += 1
+            i += 1
+        while j < len(steps2) and steps2[j] == position:
+            count2 += 1
+            j += 1
+        low = position
+
+def winners(segments, item1, item2):
+    """
+    Turn merged segments into (low, high, winner) intervals, joining neighbours with the same winner.
+    winner is 1 or 2 for the item dealing more damage, or 0 where both deal the same.
+    """
+    damage1 = item1[0] * item1[1]
+    damage2 = item2[0] * item2[1]
+    intervals = []
+    for low, high, count1, count2 in segments:
+        difference = count1 * damage1 - count2 * damage2
+        winner = 1 if difference > 0 else 2 if difference < 0 else 0
+        if intervals and intervals[-1][2] == winner:
+            intervals[-1] = (intervals[-1][0], high, winner)
+        else:
+            intervals.append((low, high, winner))
+    return intervals
+
+def duration_crossovers(item1, item2, cdr, end=60):
+    """
+    Which item deals more damage at every combat duration from 0 to end seconds, at a fixed CDR:
+    a list of (from, to, winner) intervals, where the winner changes exactly at each from.
+    """
+    segments = merge_steps(fire_times(item1[2], cdr, end), fire_times(item2[2], cdr, end), 0, end)
+    return winners(segments, item1, item2)
+
+def cdr_crossovers(item1, item2, duration, max_cdr=100):
+    """
+    Which item deals more damage at every CDR from 0 to max_cdr percent, for a fixed combat duration:
+    a list of (from, to, winner) intervals, where the winner changes exactly at each from.
+    """
+    count1 = math.floor(duration / item1[2])
+    count2 = math.floor(duration / item2[2])
+    segments = merge_steps(
+        cdr_steps(item1[2], duration, max_cdr), cdr_steps(item2[2], duration, max_cdr), 0, max_cdr, count1, count2
+    )
+    return winners(segments, item1, item2)
+
+class FightLengths:
+    """
+    A distribution of combat durations: durations (seconds) with their weights (e.g how often each fight length
+    was seen), normalised to probabilities. Prefix sums make every probability lookup a binary search.
+    """
+
+    def __init__(self, durations, weights=None):
+        order = np.argsort(durations)
+        self.durations = np.asarray(durations, dtype=np.float64)[order]
+        weights = np.ones(len(self.durations)) if weights is None else np.asarray(weights, dtype=np.float64)[order]
+        # cumulative[i]: probability of a fight shorter than durations[i]
+        self.cumulative = np.concatenate([[0.0], np.cumsum(weights) / weights.sum()])
+
+    @classmethod
+    def uniform(cls, min_duration, max_duration, step=0.1):
+        """Every fight length from min_duration to max_duration (in steps of step seconds) equally likely."""
+        return cls(np.round(np.arange(min_duration, max_duration + step / 2, step), 9))
+
+    def at_least(self, times):
+        """Probability that the fight lasts at least each of times."""
+        return 1 - self.cumulative[np.searchsorted(self.durations, times, side="left")]
+
+    def between(self, low, high):
+        """Probability that the fight length falls in [low, high)."""
+        return (self.cumulative[np.searchsorted(self.durations, high, side="left")]
+                - self.cumulative[np.searchsorted(self.durations, low, side="left")])
+
+def expected_damage(item, cdr, fight_lengths):
+    """
+    Expected damage of an item over the fight length distribution. Every hit lands if the fight lasts at least
+    until it fires, so this is the damage per hit times the sum of those probabilities.
+    """
+    times = fire_times(item[2], cdr, fight_lengths.durations[-1])
+    return item[0] * item[1] * fight_lengths.at_least(times).sum()
+
+def win_probability(item1, item2, cdr, fight_lengths):
+    """Probabilities (item 1 wins, item 2 wins, tie) over the fight length distribution, at a fixed CDR."""
+    probabilities = [0.0, 0.0, 0.0]  # Indexed by winner: tie, item 1, item 2
+    end = fight_lengths.durations[-1]
+    for low, high, winner in duration_crossovers(item1, item2, cdr, end):
+        # The last interval includes the longest fight
+        probabilities[winner] += fight_lengths.between(low, high if high < end else math.inf)
+    return probabilities[1], probabilities[2], probabilities[0]
+
+def main():
+    from preset_database import fetch_preset
+
+    parser = argparse.ArgumentParser(description="Exactly where one preset beats another.")
+    parser.add_argument("preset1")
+    parser.add_argument("preset2")
+    parser.add_argument("--cdr", type=float, default=0, help="CDR in percent, for the duration crossovers")
+    parser.add_argument("--duration", type=float, default=None, help="Also show the CDR crossovers for this fight length")
+    parser.add_argument("--max-cdr", type=float, default=100)
+    parser.add_argument("--min-duration", type=float, default=20, help="Shortest expected fight, in seconds")
+    parser.add_argument("--max-duration", type=float, default=40, help="Longest expected fight, in seconds")
+    args = parser.parse_args()
+
+    items = []
+    for name in (args.preset1, args.preset2):
+        preset = fetch_preset(name)
+        if preset is None:
+            parser.error(f"No preset named {name!r}")
+        items.append(preset[2:5])
+    item1, item2 = items
+    names = {0: "Tie", 1: args.preset1, 2: args.preset2}
+
+    print(f"At {args.cdr:g}% CDR:")
+    for low, high, winner in duration_crossovers(item1, item2, args.cdr, args.max_duration):
+        print(f"  {low:8.3f} s - {high:8.3f} s  {names[winner]}")
+    if args.duration is not None:
+        print(f"In a {args.duration:g} second fight:")
+        for low, high, winner in cdr_crossovers(item1, item2, args.duration, args.max_cdr):
+            print(f"  {low:8.3f}% - {high:8.3f}%  {names[winner]}")
+
+    fight_lengths = FightLengths.uniform(args.min_duration, args.max_duration)
+    wins1, wins2, ties = win_probability(item1, item2, args.cdr, fight_lengths)
+    print(f"Fights lasting {args.min_duration:g} to {args.max_duration:g} seconds:")
+    print(f"  {args.preset1}: {expected_damage(item1, args.cdr, fight_lengths):.2f} expected damage, wins {wins1:.1%}")
+    print(f"  {args.preset2}: {expected_damage(item2, args.cdr, fight_lengths):.2f} expected damage, wins {wins2:.1%}")
+    print(f"  Tied: {ties:.1%}")
+
+if __name__ == "__main__":
+    main()
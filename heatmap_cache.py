@@ -0,0 +1,138 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from heatmap_compute import calculate_grid, cdr_axis, duration_axis, relative_difference
+
+def grid_key(damage, mult, base_cooldown, max_cdr, x_range, step=1):
+    """Normalised cache key for a heatmap grid, so that e.g. 5 and 5.0 map to the same entry."""
+    return (float(damage), int(mult), float(base_cooldown), int(max_cdr), int(x_range), float(step))
+
+# Grids are stored as float32, half the memory of float64. That keeps about 7 significant digits, so two decimals
+# only below 100000 damage: differences are taken in float64 and values are shown with heatmap_render.format_damage
+GRID_DTYPE = np.float32
+SIGNIFICANT_DIGITS = int(np.finfo(GRID_DTYPE).nmant * np.log10(2)) + 1
+
+class HeatmapCache:
+    """
+    LRU cache of computed heatmap grids and comparisons, keyed on the parameters they were computed from.
+    Bounded by both the number of entries and their total size, so long sessions on the fine grid stay small.
+    If cache_dir is given, entries are also written there as .npz files so a restart starts warm.
+    """
+
+    def __init__(self, max_entries=64, cache_dir=None, max_bytes=128 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        self.size = 0  # Total bytes of the arrays held in memory
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()  # Shared between the Tk thread and background workers
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def get_grid(self, damage, mult, base_cooldown, max_cdr, x_range, step=1):
+        """Expected damage grid (read-only array), computed only on a cache miss."""
+        key = grid_key(damage, mult, base_cooldown, max_cdr, x_range, step)
+        (grid,) = self._lookup(("grid",) + key, lambda: (calculate_grid(*key[:5], key[5], key[5]).astype(GRID_DTYPE),))
+        return grid
+
+    def put_grid(self, grid, damage, mult, base_cooldown, max_cdr, x_range, step=1):
+        """
+        Store a grid computed elsewhere (e.g by change_max_cdr) under its parameters, so later lookups and
+        comparisons reuse it instead of recomputing. Returns the cached (read-only) array.
+        """
+        key = grid_key(damage, mult, base_cooldown, max_cdr, x_range, step)
+        (grid,) = self._lookup(("grid",) + key, lambda: (np.asarray(grid, dtype=GRID_DTYPE),))
+        return grid
+
+    def has_grid(self, damage, mult, base_cooldown, max_cdr, x_range, step=1):
+        """Whether the grid is in memory, so get_grid returns it without computing."""
+        with self._lock:
+            return ("grid",) + grid_key(damage, mult, base_cooldown, max_cdr, x_range, step) in self._entries
+
+    def get_frame(self, damage, mult, base_cooldown, max_cdr, x_range, step=1):
+        """Same as heatmap_compute.heatmap_frame, but backed by the cache."""
+        grid = self.get_grid(damage, mult, base_cooldown, max_cdr, x_range, step)
+        return pd.DataFrame(grid, columns=duration_axis(x_range, step), index=cdr_axis(max_cdr, step), copy=False)
+
+    def get_relative_difference(self, key1, key2):
+        """
+        Cached relative_difference between the grids for two grid_key tuples.
+        Returns the comparison along with the largest positive and negative value.
+        """
+        def compute():
+            comparison, max_positive, max_negative = relative_difference(self.get_grid(*key1), self.get_grid(*key2))
+            return comparison, np.array(max_positive), np.array(max_negative)
+
+        comparison, max_positive, max_negative = self._lookup(("relative",) + tuple(key1) + tuple(key2), compute)
+        return comparison, float(max_positive), float(max_negative)
+
+    def clear(self):
+        """Drop every in-memory entry. Files in cache_dir are kept."""
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def _lookup(self, key, compute):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+        value = self._load(key)
+        if value is None:
+            self.misses += 1
+            value = compute()
+            for array in value:
+                array.flags.writeable = False  # Entries are shared, so nobody may modify them in place
+            self._save(key, value)
+        else:
+            self.hits += 1
+
+        with self._lock:
+            if key not in self._entries:
+                self.size += sum(array.nbytes for array in value)
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > 1 and (len(self._entries) > self.max_entries or self.size > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)  # Evict the least recently used entry
+                self.size -= sum(array.nbytes for array in evicted)
+        return value
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, hashlib.sha1(repr(key).encode()).hexdigest() + ".npz")
+
+    def _load(self, key):
+        if self.cache_dir is None:
+            return None
+        try:
+            with np.load(self._path(key)) as stored:
+                value = tuple(stored[f"arr_{i}"] for i in range(len(stored.files)))
+        except (OSError, ValueError, KeyError):
+            return None  # Missing or unreadable file, just recompute
+        for array in value:
+            array.flags.writeable = False
+        return value
+
+    def _save(self, key, value):
+        if self.cache_dir is None:
+            return
+        path = self._path(key)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, "wb") as file:
+                np.savez(file, *value)
+            os.replace(temp_path, path)  # Atomic, so a crash never leaves a half-written entry
+        except OSError:
+            pass  # The disk store is optional, a failed write only costs a recompute later
+
+# Cache shared by every tab (and by the batch renderer within each worker process).
+# Set BAZAAR_HEATMAP_CACHE_DIR to also persist entries to disk between runs.
+default_cache = HeatmapCache(cache_dir=os.environ.get("BAZAAR_HEATMAP_CACHE_DIR") or None)
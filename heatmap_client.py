@@ -0,0 +1,71 @@
+"""
+Command line client for heatmap_service.py, e.g to fetch a heatmap or check a running service.
+
+    python heatmap_client.py heatmap.png "Fang (Bronze)" --output fang.png
+    python heatmap_client.py grid "Fang (Bronze)" --query fine_grid=1
+    python heatmap_client.py comparison.png "Fang (Bronze)" "Brass Knuckles (Bronze)" --output vs.png
+    python heatmap_client.py heatmap.png "Fang (Bronze)" --clients 8 --repeat 5
+"""
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import urlopen
+
+def fetch(url):
+    """Status, content type, body and seconds taken for a GET request."""
+    start = time.perf_counter()
+    try:
+        with urlopen(url) as response:
+            body = response.read()
+            return response.status, response.headers.get("Content-Type"), body, time.perf_counter() - start
+    except HTTPError as e:
+        return e.code, e.headers.get("Content-Type"), e.read(), time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Request heatmaps from a running heatmap_service.py.")
+    parser.add_argument("endpoint", choices=["grid", "heatmap.png", "comparison", "comparison.png", "stats"])
+    parser.add_argument("presets", nargs="*", help="Preset name (two for comparisons)")
+    parser.add_argument("--url", default="http://127.0.0.1:8765", help="Address of the service")
+    parser.add_argument("--query", action="append", default=[], metavar="NAME=VALUE",
+                        help="Extra parameter, e.g max_cdr=80 or damage=12 (repeatable)")
+    parser.add_argument("--output", help="Write the response body here (default: print JSON, summarise PNGs)")
+    parser.add_argument("--clients", type=int, default=1, help="Send this many identical requests at once")
+    parser.add_argument("--repeat", type=int, default=1, help="Rounds of requests, to see later ones served from the cache")
+    args = parser.parse_args()
+
+    query = {}
+    if args.endpoint.startswith("comparison"):
+        if len(args.presets) == 2:
+            query.update(preset1=args.presets[0], preset2=args.presets[1])
+    elif len(args.presets) == 1:
+        query["preset"] = args.presets[0]
+    for item in args.query:
+        name, _, value = item.partition("=")
+        query[name] = value
+    url = f"{args.url}/{args.endpoint}?{urlencode(query)}"
+
+    with ThreadPoolExecutor(max_workers=args.clients) as executor:
+        for round_number in range(args.repeat):
+            results = list(executor.map(fetch, [url] * args.clients))
+            timings = ", ".join(f"{seconds * 1000:.1f}" for _, _, _, seconds in results)
+            print(f"Round {round_number + 1}: {len(results)} request(s) in {timings} ms", file=sys.stderr)
+
+    status, content_type, body, _ = results[0]
+    if status != 200:
+        print(f"{status}: {body.decode(errors='replace')}", file=sys.stderr)
+        sys.exit(1)
+    if args.output:
+        with open(args.output, "wb") as file:
+            file.write(body)
+        print(f"Wrote {len(body)} bytes to {args.output}", file=sys.stderr)
+    elif content_type == "application/json":
+        print(json.dumps(json.loads(body), indent=2) if args.endpoint == "stats" else body.decode())
+    else:
+        print(f"{content_type}, {len(body)} bytes", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+import math
+import numpy as np
+import pandas as pd
+
+def calculate_value(y, x, damage, mult, base_cooldown):
+    y = y / 100
+    net_damage = damage * mult
+    cooldown_mod = (1 - min(((base_cooldown - 1) / base_cooldown), y))
+    net_cooldown = base_cooldown * cooldown_mod
+    net_dps = net_damage / net_cooldown
+    ideal_dps = (x * net_dps)
+    wasted_dps = (net_dps * (x - (net_cooldown * math.floor(x / net_cooldown))))
+    expected_damage = ideal_dps - wasted_dps
+    return expected_damage
+
+def net_cooldown(base_cooldown, cdr):
+    """Cooldown after cdr percent of cooldown reduction, never going below 1 second (as in calculate_value)."""
+    return base_cooldown * (1 - min(((base_cooldown - 1) / base_cooldown), cdr / 100))
+
+def cdr_axis(max_cdr, cdr_step=1):
+    """
+    CDR values (in percent) for each heatmap row, from max_cdr at the top down to 0.
+    Values are rounded so that steps like 0.1 land exactly on whole percents.
+    """
+    rows = int(round(max_cdr / cdr_step)) + 1
+    return np.round(np.arange(rows - 1, -1, -1) * cdr_step, 9)
+
+def duration_axis(x_range, duration_step=1):
+    """
+    Combat durations (in seconds) for each heatmap column, from 0 up to (but not including) x_range.
+    """
+    columns = int(round(x_range / duration_step))
+    return np.round(np.arange(columns) * duration_step, 9)
+
+def calculate_rows(damage, mult, base_cooldown, cdr_values, durations):
+    """
+    Vectorized calculate_value for the given CDR values (in percent, one per row) and durations (one per column).
+    """
+    y = np.asarray(cdr_values)[:, np.newaxis] / 100
+    x = np.asarray(durations)[np.newaxis, :]
+
+    # Same formula as calculate_value, broadcast over rows (CDR) and columns (duration)
+    net_damage = damage * mult
+    cooldown_mod = (1 - np.minimum(((base_cooldown - 1) / base_cooldown), y))
+    net_cooldown = base_cooldown * cooldown_mod
+    net_dps = net_damage / net_cooldown
+    ideal_dps = (x * net_dps)
+    wasted_dps = (net_dps * (x - (net_cooldown * np.floor(x / net_cooldown))))
+    expected_damage = ideal_dps - wasted_dps
+    return expected_damage
+
+def calculate_grid(damage, mult, base_cooldown, max_cdr, x_range, cdr_step=1, duration_step=1):
+    """
+    Vectorized calculate_value over the whole CDR x duration grid.
+    Row 0 is max_cdr and the last row is 0% CDR, matching the heatmap layout.
+    """
+    return calculate_rows(damage, mult, base_cooldown, cdr_axis(max_cdr, cdr_step), duration_axis(x_range, duration_step))
+
+def change_max_cdr(grid, damage, mult, base_cooldown, max_cdr, new_max_cdr, x_range, step=1):
+    """
+    Grid for new_max_cdr, reusing the rows of a grid computed for max_cdr.
+    Only the rows above the old maximum are calculated; lowering the maximum just drops the top rows.
+    """
+    added = int(round((new_max_cdr - max_cdr) / step))
+    if added <= 0:
+        return grid[-added:]
+    new_rows = calculate_rows(damage, mult, base_cooldown, cdr_axis(new_max_cdr, step)[:added], duration_axis(x_range, step))
+    return np.vstack([new_rows.astype(grid.dtype), grid])  # Keep the grid's dtype (float32 when cached)
+
+def relative_difference(grid1, grid2):
+    """
+    Relative strength of grid1 over grid2 for every cell, as a float64 array.
+    Positive cells are how much stronger grid1 is (ratio to grid2), negative cells how much stronger grid2 is.
+    Cells where only one item deals damage are filled with 1.01x the largest value of the same sign.
+    Returns the comparison along with that largest positive and negative value.
+    """
+    grid1 = np.asarray(grid1, dtype=np.float64)
+    grid2 = np.asarray(grid2, dtype=np.float64)
+    comparison = np.full(grid1.shape, np.nan)
+
+    zero1 = grid1 == 0
+    zero2 = grid2 == 0
+    nonzero = ~zero1 & ~zero2
+    first_stronger = nonzero & (grid1 > grid2)
+    second_stronger = nonzero & ~(grid1 > grid2)
+
+    # Ratio to the smaller value, negative if the larger value is from grid2
+    difference = grid1 - grid2
+    np.divide(difference, grid2, out=comparison, where=first_stronger)
+    np.divide(difference, grid1, out=comparison, where=second_stronger)
+    comparison[zero1 & zero2] = 0  # Both values are zero
+
+    # Fill cells where only one value is zero with the greatest magnitude of the same sign
+    positive = comparison[comparison > 0]
+    negative = comparison[comparison < 0]
+    max_positive = positive.max() if positive.size else np.nan
+    max_negative = negative.min() if negative.size else np.nan
+    comparison[zero1 & ~zero2] = max_negative * 1.01
+    comparison[zero2 & ~zero1] = max_positive * 1.01
+
+    return comparison, max_positive, max_negative
+
+def heatmap_frame(damage, mult, base_cooldown, max_cdr, x_range, step=1):
+    """
+    Expected damage grid as a DataFrame, indexed by CDR percent (highest at the top) with durations as columns.
+    step sets both the duration step (seconds) and the CDR step (percent).
+    """
+    return pd.DataFrame(
+        calculate_grid(damage, mult, base_cooldown, max_cdr, x_range, step, step),
+        columns=duration_axis(x_range, step),
+        index=cdr_axis(max_cdr, step)
+    )
+
+def rank_grids(grids):
+    """
+    Compare any number of equally sized grids at once.
+    The grids are stacked into one (K, rows, columns) float32 array; for every cell this finds which grid is
+    largest (the "best item") and by how much it beats the runner-up.
+    Returns the stack, the index of the best grid per cell and the margin per cell.
+    """
+    stack = np.stack([np.asarray(grid, dtype=np.float32) for grid in grids])
+    best = np.zeros(stack.shape[1:], dtype=np.intp)
+    if len(stack) == 1:
+        return stack, best, np.zeros(stack.shape[1:], dtype=np.float32)
+
+    # One running pass over the items keeping the top two values per cell, instead of sorting the whole stack.
+    # Only strictly larger values take the lead, so ties go to the first item like np.argmax
+    first = stack[0].copy()
+    second = np.full(stack.shape[1:], -np.inf, dtype=np.float32)
+    leads = np.empty(stack.shape[1:], dtype=bool)
+    for i in range(1, len(stack)):
+        grid = stack[i]
+        np.greater(grid, first, out=leads)
+        np.maximum(second, grid, out=second)
+        np.copyto(second, first, where=leads)  # The previous leader becomes the runner-up
+        np.maximum(first, grid, out=first)
+        best[leads] = i
+    return stack, best, first - second
+
+def cell_ranking(stack, row, column):
+    """Indices of the stacked grids ordered from best to worst in one cell, along with their values."""
+    values = stack[:, row, column]
+    order = np.argsort(-values, kind="stable")
+    return order, values[order]
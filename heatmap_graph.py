@@ -0,0 +1,68 @@
+import threading
+
+class DataflowNode:
+    """
+    A node of a small dataflow graph. Source nodes (no compute function) hold a value set from outside, e.g the
+    grid a weapon tab generated; derived nodes compute their value from their inputs' values, e.g a comparison.
+
+    Derived values are computed lazily, the first time get() is called after an input changed. Every node
+    has a version that goes up whenever its value changes, and a derived node remembers the input versions
+    it was computed from, so only nodes downstream of a changed input are ever recomputed. Setting a source
+    to a value with the same key as before (e.g only the colour caps changed) doesn't change its version.
+    """
+
+    def __init__(self, compute=None, inputs=()):
+        self.compute = compute
+        self.inputs = list(inputs)
+        self.key = None
+        self.value = None
+        self.version = 0
+        self.recomputes = 0
+        self._computed_from = None  # Input versions the value was computed from
+        self._lock = threading.Lock()  # Sources are set on the Tk thread, derived nodes computed on the worker
+
+    def set(self, value, key):
+        """
+        Set the value of a source node. Returns whether anything downstream needs recomputing, i.e whether
+        key (identifying the value, like a grid_key) differs from the previous one.
+        """
+        with self._lock:
+            self.value = value
+            if self.version and key == self.key:
+                return False
+            self.key = key
+            self.version += 1
+            return True
+
+    @property
+    def dirty(self):
+        """Whether get() would recompute this node (always False for sources)."""
+        if self.compute is None:
+            return False
+        with self._lock:
+            computed_from = self._computed_from
+        return any(node.dirty for node in self.inputs) or computed_from != tuple(node.version for node in self.inputs)
+
+    def get(self):
+        """The node's value, recomputing it (and any dirty node upstream) if an input changed."""
+        return self._snapshot()[0]
+
+    def _snapshot(self):
+        # Value and version read together, so a value is never paired with a newer version
+        if self.compute is None:
+            with self._lock:
+                return self.value, self.version
+
+        inputs = [node._snapshot() for node in self.inputs]
+        versions = tuple(version for _, version in inputs)
+        with self._lock:
+            if versions == self._computed_from:
+                return self.value, self.version
+
+        value = self.compute(*(value for value, _ in inputs))
+        with self._lock:
+            self.value = value
+            self._computed_from = versions
+            self.version += 1
+            self.recomputes += 1
+            return self.value, self.version
@@ -0,0 +1,254 @@
+import warnings
+from functools import partial
+import seaborn as sns
+import numpy as np
+import pandas as pd
+from matplotlib import colormaps
+from matplotlib.colors import LinearSegmentedColormap, ListedColormap, Normalize
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from heatmap_cache import SIGNIFICANT_DIGITS
+
+# Define the custom colormap with more colors for finer detail
+colors = ["red", "yellow", "green"]
+cmap = LinearSegmentedColormap.from_list("detailed_cmap", colors)
+
+# Create a custom colormap where 0 is always yellow
+comparison_cmap = LinearSegmentedColormap.from_list("custom_cmap", colors)
+
+# Distinct colors for telling items apart on the best item map (tab20's strong colors first, then the light ones)
+qualitative_colors = [colormaps["tab20"](i) for i in list(range(0, 20, 2)) + list(range(1, 20, 2))]
+
+def grid_step(durations):
+    """Spacing between two columns of a heatmap grid (1 for whole seconds, 0.1 for the fine grid)."""
+    return durations[1] - durations[0] if len(durations) > 1 else 1
+
+def format_damage(value):
+    """Damage with two decimals, or fewer where the cached grids' dtype doesn't hold them (e.g 512345.7)."""
+    if not np.isfinite(value):
+        return f"{value}"  # e.g the NaN limits of an all-NaN comparison
+    decimals = min(2, max(0, SIGNIFICANT_DIGITS - len(str(int(abs(value))))))
+    return f"{value:.{decimals}f}"
+
+def downsample(values, max_rows, max_columns, aggregate="mean"):
+    """
+    Shrink a grid to at most max_rows x max_columns by aggregating blocks of cells with their mean, max, min or
+    "absmax" (the value furthest from 0, keeping its sign), ignoring NaN. Returns the smaller grid along with the row and column edges of the blocks, in cells of the
+    original grid.
+    """
+    rows, columns = values.shape
+    block_rows = -(-rows // max_rows)
+    block_columns = -(-columns // max_columns)
+    small_rows = -(-rows // block_rows)
+    small_columns = -(-columns // block_columns)
+
+    # Pad with NaN to whole blocks, then reduce every block in one vectorized call
+    padded = np.full((small_rows * block_rows, small_columns * block_columns), np.nan)
+    padded[:rows, :columns] = values
+    blocks = padded.reshape(small_rows, block_rows, small_columns, block_columns)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # Blocks that are all NaN just stay NaN
+        if aggregate == "absmax":
+            largest = np.nanmax(blocks, axis=(1, 3))
+            smallest = np.nanmin(blocks, axis=(1, 3))
+            small = np.where(np.abs(smallest) > np.abs(largest), smallest, largest)
+        else:
+            reduce = {"mean": np.nanmean, "max": np.nanmax, "min": np.nanmin}[aggregate]
+            small = reduce(blocks, axis=(1, 3))
+
+    row_edges = np.minimum(np.arange(small_rows + 1) * block_rows, rows)
+    column_edges = np.minimum(np.arange(small_columns + 1) * block_columns, columns)
+    return small, row_edges, column_edges
+
+def centered_cmap(base_cmap, vmin, vmax, center=0):
+    """
+    Resample base_cmap so that center always gets the middle color, the same way sns.heatmap(center=...) does.
+    """
+    vrange = max(vmax - center, center - vmin)
+    cmin, cmax = Normalize(center - vrange, center + vrange)([vmin, vmax])
+    return ListedColormap(base_cmap(np.linspace(cmin, cmax, 256)))
+
+def create_figure(width, height=5):
+    """
+    Create an off-screen figure backed by an Agg canvas.
+    Unlike plt.subplots, this doesn't touch pyplot's global state, so it is safe in worker threads and processes.
+    """
+    fig = Figure(figsize=(width, height))
+    FigureCanvasAgg(fig)
+    return fig
+
+class HeatmapPlot:
+    """
+    A heatmap drawn on a persistent figure.
+    The first call builds the plot with seaborn; after that, new data only updates the existing mesh, colour
+    limits and tick labels in place (or swaps in a new mesh if the grid dimensions changed).
+    """
+
+    def __init__(self, fig):
+        self.fig = fig
+        self.ax = fig.add_subplot()
+        self.mesh = None
+        self.colorbar = None
+        self._mesh_layout = None  # (grid shape, mesh shape) of the shown mesh
+        self._redraw = None  # The last show_* call with its current color limits, to redraw at another level of detail
+        self._lod_shape = None  # Shape of the shown grid, if it is drawn downsampled when larger than lod_size
+
+        # Level of detail: with lod set and lod_size to (rows, columns), larger grids are drawn downsampled to
+        # lod_size, each drawn cell aggregating a block of data points. "extremes" keeps peaks visible (the max of
+        # damage grids, the value furthest from 0 of comparisons); "mean", "max" or "min" apply to every grid
+        self.lod = None
+        self.lod_size = None
+
+    def show_heatmap(self, df, vmin, vmax):
+        """Show a single item heatmap. df has CDR percents as its index and durations as its columns."""
+        self._redraw = partial(self.show_heatmap, df, vmin=vmin, vmax=vmax)
+        self._show(df, cmap, vmin, vmax)
+        self._set_colorbar_ticks(vmin, vmax)
+        self._set_grid_ticks(df)
+
+    def show_ranking(self, best_df, names):
+        """
+        Show which item is best in every cell. best_df holds, per cell, the index into names of the best item.
+        Only the items that win somewhere get a color and an entry on the color bar.
+        """
+        self._redraw = partial(self.show_ranking, best_df, names)
+        winners = np.unique(best_df.values)
+        compact = pd.DataFrame(np.searchsorted(winners, best_df.values), index=best_df.index, columns=best_df.columns)
+        ranking_cmap = ListedColormap([qualitative_colors[i % len(qualitative_colors)] for i in range(len(winners))])
+        self._show(compact, ranking_cmap, -0.5, len(winners) - 0.5, lod=None)  # Item indices can't be aggregated
+        self.colorbar.set_ticks(range(len(winners)))
+        self.colorbar.set_ticklabels([names[winner] for winner in winners])
+        self._set_grid_ticks(best_df)
+
+    def show_slice(self, df, vmin, vmax, y_label, x_label):
+        """
+        Show a heatmap whose axes can be any swept variable (e.g base cooldown on the y-axis). The index and
+        columns of df hold the values along each axis; CDR values (an axis named "cdr") are shown as percents.
+        """
+        self._redraw = partial(self.show_slice, df, vmin=vmin, vmax=vmax, y_label=y_label, x_label=x_label)
+        self._show(df, cmap, vmin, vmax)
+        self._set_colorbar_ticks(vmin, vmax)
+        for labels, set_ticks, set_ticklabels in (
+            (df.index, self.ax.set_yticks, self.ax.set_yticklabels),
+            (df.columns, self.ax.set_xticks, self.ax.set_xticklabels),
+        ):
+            ticks = np.unique(np.linspace(0, len(labels) - 1, min(len(labels), 11)).round().astype(int))
+            set_ticks(ticks + 0.5)  # Centered on the cells
+            if labels.name == "cdr":
+                set_ticklabels([f"{labels[tick] / 100:.0%}" for tick in ticks])
+            else:
+                set_ticklabels([f"{labels[tick]:g}" for tick in ticks])
+        self.ax.set_ylabel(y_label)
+        self.ax.set_xlabel(x_label)
+
+    def _set_grid_ticks(self, df):
+        cdr_values = df.index.to_numpy()
+        durations = df.columns.to_numpy()
+        step = grid_step(durations)
+        x_range = int(round(durations[-1] + step))
+        self.ax.set_yticks(np.linspace(0, df.shape[0] - 1, 11))
+        self.ax.set_yticklabels([f"{y / 100:.0%}" for y in np.linspace(cdr_values[0], 0, 11)])  # Correct order for tick labels
+        self.ax.set_xticks(np.arange(0, x_range + 1, 5) / step)
+        self.ax.set_xticklabels(range(0, x_range + 1, 5))
+        self.ax.set_xlabel("Combat Duration (seconds)")
+
+    def set_color_limits(self, vmin, vmax):
+        """Re-normalise the colors of the shown single item heatmap, without touching its data."""
+        self.mesh.set_clim(vmin, vmax)
+        self._set_colorbar_ticks(vmin, vmax)
+        if self._redraw is not None and "vmin" in self._redraw.keywords:
+            self._redraw = partial(self._redraw, vmin=vmin, vmax=vmax)  # Nested partials are flattened
+
+    def _downsampled_at(self, lod_size):
+        """Whether the shown grid is drawn downsampled when the level of detail is lod_size (rows, columns)."""
+        if self.lod is None or self._lod_shape is None or lod_size is None:
+            return False
+        return self._lod_shape[0] > lod_size[0] or self._lod_shape[1] > lod_size[1]
+
+    def _set_colorbar_ticks(self, vmin, vmax):
+        cbar_ticks = np.linspace(vmin, vmax, 5)
+        self.colorbar.set_ticks(cbar_ticks)
+        self.colorbar.set_ticklabels([format_damage(tick) for tick in cbar_ticks])
+
+    def show_comparison(self, comparison_df, absolute_damage):
+        """Show a comparison heatmap, either as absolute damage differences or relative (percentage) differences."""
+        vmin = np.nanmin(comparison_df.values)
+        vmax = np.nanmax(comparison_df.values)
+        self._redraw = partial(self.show_comparison, comparison_df, absolute_damage)
+        # Center the color scale on 0
+        self._show(comparison_df, centered_cmap(comparison_cmap, vmin, vmax), vmin, vmax, lod="absmax")
+
+        # Modify the legend (color bar) formatting
+        cbar_ticks = np.linspace(vmin, vmax, 5)
+        self.colorbar.set_ticks(cbar_ticks)
+        if absolute_damage:
+            # Absolute Damage: Display as raw values
+            self.colorbar.set_ticklabels([format_damage(tick) for tick in cbar_ticks])
+        else:
+            # Relative Damage: Display as percentages
+            self.colorbar.set_ticklabels([f"{tick * 100:.0f}%" for tick in cbar_ticks])
+
+        self.ax.set_xlabel("Combat Duration (seconds)")
+
+        # Grid axes (duration in seconds, CDR in percent)
+        durations = comparison_df.columns.to_numpy()
+        cdr_values = comparison_df.index.to_numpy()
+        step = grid_step(durations)
+
+        # Modify the x-axis to have ticks every 5 seconds
+        x_ticks = range(0, int(round(durations[-1] + step)) + 1, 5)
+        self.ax.set_xticks(np.array(x_ticks) / step)
+        self.ax.set_xticklabels(x_ticks)
+
+        # Modify the y-axis to increase as it gets further away from the x-axis
+        y_ticks = np.arange(0, comparison_df.shape[0], int(round(10 / step)))
+        self.ax.set_yticks(y_ticks)
+        self.ax.set_yticklabels([f"{cdr_values[tick] / 100:.0%}" for tick in y_ticks])
+
+    def _show(self, df, mesh_cmap, vmin, vmax, lod="max"):
+        # lod is how blocks of this grid are aggregated in "extremes" mode, None if it must never be downsampled
+        self._lod_shape = df.shape if lod else None
+        values = df.values
+        edges = None
+        if self._downsampled_at(self.lod_size):
+            # Larger than the plot in pixels: draw one cell per block of cells instead of one per data point
+            aggregate = lod if self.lod == "extremes" else self.lod
+            values, row_edges, column_edges = downsample(values, *self.lod_size, aggregate)
+            edges = (column_edges, row_edges)
+        values = np.ma.masked_invalid(np.asarray(values, dtype=float))  # Float, so e.g ranking indices can hold NaN
+        layout = (df.shape, values.shape)
+
+        if self.mesh is not None and self._mesh_layout == layout:
+            # Same dimensions: swap the data in the existing mesh
+            self.mesh.set_array(values)
+            self.mesh.set_cmap(mesh_cmap)
+            self.mesh.set_clim(vmin, vmax)
+            return
+
+        if self.mesh is None:
+            # First heatmap on this figure: let seaborn build the axes and color bar
+            sns.heatmap(
+                values.filled(np.nan),
+                cbar_kws={'orientation': 'vertical'},
+                xticklabels=False,  # Tick labels are set by the caller
+                yticklabels=False,
+                vmin=vmin,
+                vmax=vmax,
+                cmap=mesh_cmap,
+                ax=self.ax
+            )
+            self.mesh = self.ax.collections[0]
+            self.colorbar = self.mesh.colorbar
+            self._mesh_layout = (values.shape, values.shape)
+            if self._mesh_layout == layout:
+                return
+
+        # New dimensions: replace just the mesh and point the existing color bar at it. The axes always span the
+        # full grid (one unit per data point), also when the mesh is downsampled, so ticks and hover stay exact
+        old_mesh = self.mesh
+        self.mesh = self.ax.pcolormesh(*(edges or ()), values, cmap=mesh_cmap, vmin=vmin, vmax=vmax)
+        old_mesh.remove()
+        self._mesh_layout = layout
+        self.ax.set(xlim=(0, df.shape[1]), ylim=(df.shape[0], 0))  # Keep the y-axis inverted like seaborn
+        self.colorbar.update_normal(self.mesh)
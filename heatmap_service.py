@@ -0,0 +1,300 @@
+"""
+Local HTTP service serving heatmaps to several people at once, without the GUI.
+
+    python heatmap_service.py --port 8765
+
+Endpoints (GET, parameters in the query string):
+    /grid             Expected damage grid as JSON
+    /heatmap.png      Rendered heatmap
+    /comparison       Comparison grid as JSON (relative, or absolute with absolute_damage=1)
+    /comparison.png   Rendered comparison heatmap
+    /stats            Cache statistics
+
+An item is given either as preset=<name> or as damage, mult and base_cooldown; comparisons take the same
+parameters with a 1 or 2 suffix (preset1, damage2, ...). max_cdr, end_at_storm, fine_grid, low_cap and
+high_cap work like in the GUI.
+"""
+import argparse
+import asyncio
+import io
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from batch_render import get_worker_plot, parse_cap as parse_preset_cap
+from heatmap_cache import default_cache, grid_key
+from heatmap_compute import relative_difference
+from preset_database import fetch_preset
+
+class RequestError(Exception):
+    """A request that can't be served, with the HTTP status to answer it with."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class ResponseCache:
+    """
+    LRU cache of finished response bodies (PNG or JSON bytes), keyed on the normalised request parameters.
+    Bounded both by number of entries and by their total size in bytes.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+    def put(self, key, value):
+        with self._lock:
+            if key in self._entries:
+                self.size -= len(self._entries.pop(key)[1])
+            self._entries[key] = value
+            self.size += len(value[1])
+            while self._entries and (len(self._entries) > self.max_entries or self.size > self.max_bytes):
+                _, (_, body) = self._entries.popitem(last=False)  # Evict the least recently used entry
+                self.size -= len(body)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self.size, "hits": self.hits, "misses": self.misses}
+
+def parse_flag(query, name):
+    return query.get(name, "0").lower() in ("1", "true", "yes", "on")
+
+def parse_number(query, name, kind=float, default=None):
+    value = query.get(name, "")
+    if value == "":
+        if default is None:
+            raise RequestError(400, f"Missing parameter {name}.")
+        return default
+    try:
+        return kind(value)
+    except ValueError:
+        raise RequestError(400, f"Parameter {name} must be a number.") from None
+
+def parse_cap(query, name, preset_value):
+    if name in query:
+        return parse_number(query, name) if query[name] != "" else None
+    return parse_preset_cap(preset_value)
+
+def parse_item(query, suffix=""):
+    """
+    (damage, mult, base_cooldown, low_cap, high_cap, max_cdr) of the item in a request, from a preset name
+    and/or explicit values (which override the preset's).
+    """
+    preset = None
+    if query.get("preset" + suffix):
+        preset = fetch_preset(query["preset" + suffix])
+        if preset is None:
+            raise RequestError(404, f"No preset named {query['preset' + suffix]!r}.")
+    _, _, damage, mult, base_cooldown, low_cap, high_cap, max_cdr = preset or (None, None, None, 1, None, "", "", 50)
+    base_cooldown = parse_number(query, "base_cooldown" + suffix, float, base_cooldown)
+    if base_cooldown <= 0:
+        raise RequestError(400, "Base cooldown must be positive.")
+    return (
+        parse_number(query, "damage" + suffix, float, damage),
+        parse_number(query, "mult" + suffix, int, mult),
+        base_cooldown,
+        parse_cap(query, "low_cap", low_cap),
+        parse_cap(query, "high_cap", high_cap),
+        int(max_cdr),
+    )
+
+def parse_grid(query, max_cdr):
+    """(max_cdr, x_range, step) of the requested grid, with max_cdr defaulting to the item's."""
+    max_cdr = parse_number(query, "max_cdr", int, max_cdr)
+    if max_cdr < 10 or max_cdr > 100:
+        raise RequestError(400, "Maximum CDR must be an integer between 10 and 100.")
+    return max_cdr, 30 if parse_flag(query, "end_at_storm") else 60, 0.1 if parse_flag(query, "fine_grid") else 1
+
+def grid_json(df):
+    df = df.astype("float64").round(6)  # Grids are stored as float32, don't serialise its rounding noise
+    return json.dumps({
+        "cdr": df.index.tolist(),
+        "duration": df.columns.tolist(),
+        "values": df.astype(object).where(df.notna(), None).values.tolist(),  # NaN isn't valid JSON
+    }).encode()
+
+def render_png(plot, title):
+    plot.ax.set_title(title)
+    buffer = io.BytesIO()
+    plot.fig.savefig(buffer, format="png", bbox_inches="tight")
+    return buffer.getvalue()
+
+def comparison_frame(key1, key2, absolute_damage):
+    import pandas as pd
+
+    df1 = default_cache.get_frame(*key1)
+    if absolute_damage:
+        return df1.astype("float64") - default_cache.get_frame(*key2)
+    comparison, _, _ = relative_difference(df1.values, default_cache.get_grid(*key2))
+    return pd.DataFrame(comparison, index=df1.index, columns=df1.columns)
+
+def build_response(path, query):
+    """
+    Cache key and a function computing the (content type, body) for a request.
+    Parsing is cheap and done up front; the returned function does the actual work on the render thread.
+    """
+    if path in ("/grid", "/heatmap.png"):
+        damage, mult, base_cooldown, low_cap, high_cap, max_cdr = parse_item(query)
+        key = grid_key(damage, mult, base_cooldown, *parse_grid(query, max_cdr))
+        if path == "/grid":
+            return ("grid",) + key, lambda: ("application/json", grid_json(default_cache.get_frame(*key)))
+
+        def heatmap():
+            df = default_cache.get_frame(*key)
+            vmin = low_cap if low_cap is not None else df.values.min()
+            vmax = high_cap if high_cap is not None else df.values.max()
+            plot = get_worker_plot("heatmap")  # Plots are only touched by the single render thread
+            plot.show_heatmap(df, vmin, vmax)
+            return "image/png", render_png(plot, query.get("preset", ""))
+
+        return ("heatmap", query.get("preset", "")) + key + (low_cap, high_cap), heatmap  # The name is the title
+
+    if path in ("/comparison", "/comparison.png"):
+        item1 = parse_item(query, "1")
+        item2 = parse_item(query, "2")
+        grid = parse_grid(query, max(item1[5], item2[5]))  # Both at the larger Maximum CDR, like batch_render
+        key1 = grid_key(*item1[:3], *grid)
+        key2 = grid_key(*item2[:3], *grid)
+        absolute_damage = parse_flag(query, "absolute_damage")
+        if path == "/comparison":
+            return (path, absolute_damage) + key1 + key2, lambda: (
+                "application/json", grid_json(comparison_frame(key1, key2, absolute_damage))
+            )
+
+        title = f"{query['preset1']} vs {query['preset2']}" if query.get("preset1") and query.get("preset2") else ""
+
+        def comparison():
+            plot = get_worker_plot("comparison")
+            plot.show_comparison(comparison_frame(key1, key2, absolute_damage), absolute_damage)
+            return "image/png", render_png(plot, title)
+
+        return (path, absolute_damage, title) + key1 + key2, comparison
+
+    raise RequestError(404, f"Unknown path {path}.")
+
+class HeatmapService:
+    """
+    Serves heatmap requests over HTTP with asyncio. Connections are handled concurrently on the event loop;
+    computing and rendering run on one background thread (the figures aren't thread safe), and identical
+    requests arriving while one is being rendered wait for that render instead of starting their own.
+    """
+
+    def __init__(self, cache=None):
+        self.cache = cache or ResponseCache()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="HeatmapRender")
+        self._in_flight = {}  # cache key -> future of the render in progress
+        self.renders = 0  # Responses actually computed (the rest came from the cache or a shared render)
+
+    async def respond(self, path, query):
+        """(status, content type, body) for a GET request."""
+        if path == "/stats":
+            return 200, "application/json", json.dumps(dict(self.cache.stats(), renders=self.renders)).encode()
+
+        key, compute = build_response(path, query)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return (200,) + cached
+
+        future = self._in_flight.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().run_in_executor(self._executor, compute)
+            self.renders += 1
+            self._in_flight[key] = future
+            future.add_done_callback(lambda done: self._finish(key, done))
+        # Shielded, so a client disconnecting doesn't cancel the render for everyone else waiting on it
+        return (200,) + await asyncio.shield(future)
+
+    def _finish(self, key, future):
+        del self._in_flight[key]
+        if not future.cancelled() and future.exception() is None:
+            self.cache.put(key, future.result())
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._write(writer, 400, "text/plain", b"Malformed request line.", False)
+                    break
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+
+                if method != "GET":
+                    status, content_type, body = 405, "text/plain", b"Only GET is supported."
+                else:
+                    url = urlsplit(target)
+                    query = {name: values[-1] for name, values in parse_qs(url.query, keep_blank_values=True).items()}
+                    try:
+                        status, content_type, body = await self.respond(url.path, query)
+                    except RequestError as e:
+                        status, content_type, body = e.status, "text/plain", str(e).encode()
+                    except Exception as e:
+                        status, content_type, body = 500, "text/plain", f"Error: {e}".encode()
+                await self._write(writer, status, content_type, body, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass  # The client went away
+        finally:
+            writer.close()
+
+    async def _write(self, writer, status, content_type, body, keep_alive):
+        reasons = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+        writer.write((
+            f"HTTP/1.1 {status} {reasons.get(status, 'Error')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        ).encode("latin-1") + body)
+        await writer.drain()
+
+    async def serve(self, host="127.0.0.1", port=8765):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"Serving heatmaps on http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve heatmaps (JSON grids and PNGs) over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: this machine only)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--cache-entries", type=int, default=256, help="Most responses kept in memory")
+    parser.add_argument("--cache-mb", type=float, default=64, help="Most megabytes of responses kept in memory")
+    args = parser.parse_args()
+
+    service = HeatmapService(ResponseCache(args.cache_entries, int(args.cache_mb * 1024 * 1024)))
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
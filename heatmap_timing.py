@@ -0,0 +1,82 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+# Stage timing is off by default. BAZAAR_HEATMAP_TIMING=1 shows each tab's last breakdown in its status bar;
+# BAZAAR_HEATMAP_TRACE=<file> does the same and also writes every recorded span to that file on exit.
+trace_path = os.environ.get("BAZAAR_HEATMAP_TRACE") or None
+enabled = bool(os.environ.get("BAZAAR_HEATMAP_TIMING")) or trace_path is not None
+
+# Every recorded span as (stage, run label, thread name, start ns, end ns); the oldest are dropped when full
+_spans = deque(maxlen=100000)
+_epoch = time.perf_counter_ns()
+
+class TimingRun:
+    """
+    Timings of the stages (parsing, computing, plotting, drawing, ...) of one heatmap generation.
+    Stages may run on different threads; each span is also kept for the trace export.
+    When timing is disabled, span() does nothing.
+    """
+
+    def __init__(self, label):
+        self.label = label
+        self.stages = []  # (stage, seconds) in the order they finished
+        self._start = time.perf_counter_ns()
+        self._end = None
+
+    def span(self, stage):
+        """Context manager timing one stage of the run."""
+        if not enabled:
+            return nullcontext()
+        return self._span(stage)
+
+    @contextmanager
+    def _span(self, stage):
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            end = time.perf_counter_ns()
+            self.stages.append((stage, (end - start) / 1e9))
+            _spans.append((stage, self.label, threading.current_thread().name, start, end))
+
+    def finish(self):
+        """Mark the run as complete (the total includes time spent waiting between stages)."""
+        self._end = time.perf_counter_ns()
+
+    def summary(self):
+        """One line breakdown for the status bar, e.g "parse 0.1 · compute 2.3 · ... · total 120 ms"."""
+        end = self._end if self._end is not None else time.perf_counter_ns()
+        parts = [f"{stage} {seconds * 1000:.1f}" for stage, seconds in self.stages]
+        parts.append(f"total {(end - self._start) / 1e6:.0f} ms")
+        return " · ".join(parts)
+
+def export_trace(path):
+    """
+    Write every recorded span as a Chrome trace (open it in chrome://tracing or https://ui.perfetto.dev).
+    Returns the number of spans written.
+    """
+    spans = list(_spans)
+    thread_ids = {}
+    events = []
+    for stage, label, thread_name, start, end in spans:
+        tid = thread_ids.setdefault(thread_name, len(thread_ids) + 1)
+        events.append({
+            "name": stage,
+            "cat": label,
+            "ph": "X",
+            "ts": (start - _epoch) / 1000,  # Microseconds
+            "dur": (end - start) / 1000,
+            "pid": os.getpid(),
+            "tid": tid,
+            "args": {"run": label},
+        })
+    for thread_name, tid in thread_ids.items():
+        events.append({"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid, "args": {"name": thread_name}})
+
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
+    return len(spans)
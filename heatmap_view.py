@@ -0,0 +1,233 @@
+import os
+import threading
+from contextlib import nullcontext
+import tkinter as tk
+from tkinter import ttk
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.patches import Rectangle
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+from heatmap_render import HeatmapPlot
+
+# Level of detail for grids larger than the plot: each pixel shows the "extremes" (default: the highest damage, or
+# the difference furthest from 0 in comparisons), "mean", "max" or "min" of the data points it covers, or set
+# BAZAAR_HEATMAP_LOD=off to always draw every data point
+lod_mode = os.environ.get("BAZAAR_HEATMAP_LOD", "extremes").lower()
+PREVIEW_FACTOR = 8  # Progressive rendering first shows a preview with this many times fewer cells per axis
+
+class HeatmapCanvas(FigureCanvasTkAgg):
+    """
+    A FigureCanvasTkAgg whose figure may also be updated and rasterised by a background worker.
+    render_lock is held by whichever thread is touching the figure. Draws requested on the Tk thread while a
+    worker holds it are retried shortly after, so the Tk thread never blocks waiting for a render.
+    """
+
+    def __init__(self, figure, master):
+        super().__init__(figure, master=master)
+        self.render_lock = threading.Lock()
+
+    def draw(self):
+        if threading.current_thread() is not threading.main_thread():
+            # Off-screen only (e.g seaborn drawing while a worker builds the heatmap), the Tk thread presents it
+            FigureCanvasAgg.draw(self)
+            return
+        if not self.render_lock.acquire(blocking=False):
+            self.get_tk_widget().after(10, self.draw_idle)  # A worker is rendering, try again once it is done
+            return
+        try:
+            super().draw()
+        finally:
+            self.render_lock.release()
+
+class HeatmapView(HeatmapPlot):
+    """
+    A HeatmapPlot embedded in a tab's plot frame, together with the label showing cursor information.
+    The figure, canvas and label are created once per tab and reused for every generated heatmap.
+    """
+
+    def __init__(self, plot_frame, label_side=tk.TOP, resize_delay=100, hover_interval=16):
+        super().__init__(Figure(figsize=(plot_frame.winfo_width() / 100, 5)))  # Dynamic width
+        self.plot_frame = plot_frame
+        self.resize_delay = resize_delay  # Milliseconds to wait for resizing to settle before redrawing
+        self.hover_interval = hover_interval  # Milliseconds between hover updates (~60 per second)
+        self._pending_resize = None
+        self.lod = lod_mode if lod_mode in ("extremes", "mean", "max", "min") else None
+
+        # Hover state: raw values of the shown grid, the function describing a cell, and what is cached
+        # between draws (inverse data transform and the background behind the cell highlight)
+        self.hover_values = None
+        self.describe_cell = None
+        self._inverse_transform = None
+        self._background = None
+        self._hover_event = None
+        self._pending_hover = None
+        self._hovered_cell = None
+        self.highlight = Rectangle((0, 0), 1, 1, fill=False, edgecolor="black", linewidth=1.5, animated=True, visible=False)
+
+        # Embed the heatmap in the Tkinter window
+        self.canvas = HeatmapCanvas(self.fig, master=plot_frame)
+        self.canvas_widget = self.canvas.get_tk_widget()
+        self.canvas_widget.pack(fill=tk.BOTH, expand=True)
+
+        # Add a label next to the heatmap to display cursor information
+        self.info_label = ttk.Label(plot_frame, text="", anchor="center", justify="center")
+        self.info_label.pack(side=label_side, pady=5)
+
+        # Replace the canvas' own resize handler with a debounced one, so dragging the window edge
+        # coalesces into a single redraw once the size stops changing
+        self.canvas_widget.bind("<Configure>", self.on_configure)
+
+        # Hover readout: motion events are coalesced and only the latest one is handled
+        self.canvas_widget.bind("<Motion>", self.on_motion)
+        self.canvas_widget.bind("<Leave>", self.on_leave)
+        self.canvas.mpl_connect("draw_event", self.on_draw)
+
+    def set_hover(self, values, describe_cell):
+        """
+        Set the grid the hover readout reads from, and a function describe_cell(row, column, value)
+        returning the text shown for the cell under the cursor.
+        """
+        self.hover_values = np.asarray(values)
+        self.describe_cell = describe_cell
+        self._hovered_cell = None
+
+    def draw(self):
+        """Redraw the canvas after the heatmap has been updated."""
+        self.canvas.draw_idle()
+
+    def render_offscreen(self, update, timing=None):
+        """
+        Run update() (e.g show_heatmap) and rasterise the figure into the Agg buffer, all under the render lock
+        and without touching Tk. Safe to call from a worker thread; present() then shows the result.
+        If a TimingRun is given, the two steps are recorded as its "plot" and "draw" stages.
+        """
+        with self.canvas.render_lock:
+            self.lod_size = self.pixel_size()
+            with timing.span("plot") if timing is not None else nullcontext():
+                update()
+            with timing.span("draw") if timing is not None else nullcontext():
+                FigureCanvasAgg.draw(self.canvas)
+
+    def render_preview(self, job, update, lod_size=None, timing=None):
+        """
+        Render update() off-screen like render_offscreen (at lod_size, if given) and hand it to the Tk thread with
+        job.progress, whose on_progress should present() it. Used to show something while the work goes on.
+        """
+        with self.canvas.render_lock:
+            self.lod_size = lod_size or self.pixel_size()
+            with timing.span("preview") if timing is not None else nullcontext():
+                update()
+                FigureCanvasAgg.draw(self.canvas)
+        job.progress(None)
+
+    def render_progressive(self, job, update, shape, timing=None):
+        """
+        Like render_offscreen, for a grid of the given shape. If the grid has many more cells than the plot has
+        pixels, a coarse preview of it is rendered and presented first, as drawing every level of detail of a
+        large grid takes longer than computing it.
+        """
+        rows, columns = self.pixel_size()
+        if self.lod is not None and (shape[0] > rows * 2 or shape[1] > columns * 2):
+            self.render_preview(job, update, (max(1, rows // PREVIEW_FACTOR), max(1, columns // PREVIEW_FACTOR)), timing)
+            if job.cancelled:
+                return
+        self.render_offscreen(update, timing)
+
+    def pixel_size(self):
+        """Size of the heatmap's axes in pixels, as (rows, columns)."""
+        extent = self.ax.get_window_extent()
+        return max(1, int(extent.height)), max(1, int(extent.width))
+
+    def present(self):
+        """Copy the last off-screen render onto the Tk canvas. Must be called on the Tk thread."""
+        if self.canvas.render_lock.acquire(blocking=False):
+            try:
+                self.canvas.blit()
+            finally:
+                self.canvas.render_lock.release()
+        # Otherwise a newer render is in progress, and it will be presented when it finishes
+
+    def _show(self, df, mesh_cmap, vmin, vmax, lod="max"):
+        super()._show(df, mesh_cmap, vmin, vmax, lod)
+        if self.highlight not in self.ax.patches:
+            self.ax.add_patch(self.highlight)  # Rebuilding the heatmap clears the axes, so add it back
+        self.highlight.set_visible(False)
+
+    def on_configure(self, event):
+        if self._pending_resize is not None:
+            self.canvas_widget.after_cancel(self._pending_resize)
+        self._pending_resize = self.canvas_widget.after(self.resize_delay, self._resize, event)
+
+    def _resize(self, event):
+        if not self.canvas.render_lock.acquire(blocking=False):
+            # A worker is rendering at the old size, resize once it is done
+            self._pending_resize = self.canvas_widget.after(self.resize_delay, self._resize, event)
+            return
+        self._pending_resize = None
+        try:
+            self.canvas.resize(event)  # Resizes the figure to the widget and schedules one draw
+            lod_size, self.lod_size = self.lod_size, self.pixel_size()
+            if lod_size != self.lod_size and (self._downsampled_at(lod_size) or self._downsampled_at(self.lod_size)):
+                # Re-aggregate the shown grid for the new number of pixels (nothing is recomputed)
+                self._redraw()
+        finally:
+            self.canvas.render_lock.release()
+
+    def on_draw(self, event):
+        # Cache everything hover needs until the next full draw (e.g after a resize or new data)
+        self._inverse_transform = self.ax.transData.inverted()
+        self._background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self._hovered_cell = None
+
+    def on_motion(self, event):
+        self._hover_event = (event.x, event.y)
+        if self._pending_hover is None:
+            self._pending_hover = self.canvas_widget.after(self.hover_interval, self._update_hover)
+
+    def on_leave(self, event):
+        self._hover_event = None
+        if self._pending_hover is None:
+            self._pending_hover = self.canvas_widget.after(self.hover_interval, self._update_hover)
+
+    def _update_hover(self):
+        self._pending_hover = None
+        if self.hover_values is None or self._inverse_transform is None:
+            return
+        if not self.canvas.render_lock.acquire(blocking=False):
+            # A worker is rendering this figure, try again on the next frame
+            self._pending_hover = self.canvas_widget.after(self.hover_interval, self._update_hover)
+            return
+        try:
+            self._refresh_hover()
+        finally:
+            self.canvas.render_lock.release()
+
+    def _refresh_hover(self):
+        cell = None
+        if self._hover_event is not None:
+            # Tk measures y from the top of the widget, matplotlib from the bottom
+            height = self.canvas.get_width_height(physical=True)[1]
+            x_pixel, y_pixel = self._hover_event
+            x_data, y_data = self._inverse_transform.transform((x_pixel, height - y_pixel))
+            column = int(np.floor(x_data))  # Use floor to align with heatmap cells
+            row = int(np.floor(y_data))  # The y-axis is inverted, so this is already the row index
+            rows, columns = self.hover_values.shape
+            if 0 <= column < columns and 0 <= row < rows:
+                cell = (row, column)
+
+        if cell == self._hovered_cell:
+            return  # Still inside the same cell, nothing to update
+        self._hovered_cell = cell
+
+        if cell is not None:
+            row, column = cell
+            self.info_label.config(text=self.describe_cell(row, column, self.hover_values[row, column]))
+            self.highlight.set_xy((column, row))
+        self.highlight.set_visible(cell is not None)
+
+        # Blit only the highlight over the cached background instead of redrawing the figure
+        self.canvas.restore_region(self._background)
+        self.ax.draw_artist(self.highlight)
+        self.canvas.blit(self.ax.bbox)
@@ -0,0 +1,111 @@
+import queue
+import threading
+import traceback
+
+class HeatmapJob:
+    """A unit of work submitted to the HeatmapWorker. cancelled becomes True once a newer job replaces it."""
+
+    def __init__(self, key, work, on_done, on_error, on_progress=None, results=None):
+        self.key = key
+        self.work = work
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_progress = on_progress
+        self.cancelled = False
+        self._results = results
+
+    def progress(self, value, timeout=1.0):
+        """
+        Called from work: hand an intermediate result (e.g a preview) to on_progress on the Tk thread, and wait
+        until it has been handled (at most timeout seconds), so work doesn't replace what is being presented.
+        """
+        if self.on_progress is None or self.cancelled:
+            return
+        handled = threading.Event()
+        self._results.put((self, value, None, handled))
+        handled.wait(timeout)
+
+class HeatmapWorker:
+    """
+    Runs heatmap generation (compute and off-screen rendering) on a background thread.
+    Finished results are handed back to the Tk thread by polling with after(), since Tk widgets may only be
+    touched from the thread running the mainloop. Submitting a job for a key (e.g a tab name) cancels any
+    job still pending for the same key, so only the latest inputs are ever shown.
+    """
+
+    def __init__(self, widget, poll_interval=15):
+        self.widget = widget  # Any Tk widget, used to schedule polling on the Tk thread
+        self.poll_interval = poll_interval
+        self._jobs = queue.Queue()
+        self._results = queue.Queue()
+        self._latest = {}  # key -> most recently submitted job
+        self._polling = False
+        self._thread = threading.Thread(target=self._run, name="HeatmapWorker", daemon=True)
+        self._thread.start()
+
+    def submit(self, key, work, on_done, on_error=None, on_progress=None):
+        """
+        Queue work(job) to run on the worker thread. on_done(result) is then called on the Tk thread,
+        or on_error(exception) if work raised. work may check job.cancelled to stop early, and report
+        intermediate results with job.progress(value), which calls on_progress(value) on the Tk thread.
+        """
+        previous = self._latest.get(key)
+        if previous is not None:
+            previous.cancelled = True
+        job = HeatmapJob(key, work, on_done, on_error, on_progress, self._results)
+        self._latest[key] = job
+        self._jobs.put(job)
+        if not self._polling:
+            self._polling = True
+            self.widget.after(self.poll_interval, self._poll)
+        return job
+
+    def is_busy(self, key):
+        """Whether a job for this key is still queued or running."""
+        return key in self._latest
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            if job.cancelled:
+                continue  # Superseded before it even started
+            try:
+                result = job.work(job)
+                error = None
+            except Exception as e:
+                traceback.print_exc()
+                result, error = None, e
+            self._results.put((job, result, error, None))
+
+    def _poll(self):
+        # Runs on the Tk thread: deliver finished results, dropping those of superseded jobs
+        while True:
+            try:
+                job, result, error, handled = self._results.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                if handled is not None:
+                    # Intermediate result: only shown if the job is still current, and the job keeps running
+                    if not job.cancelled and self._latest.get(job.key) is job:
+                        job.on_progress(result)
+                    continue
+                if job.cancelled or self._latest.get(job.key) is not job:
+                    continue
+                del self._latest[job.key]
+                if error is not None:
+                    if job.on_error is not None:
+                        job.on_error(error)
+                else:
+                    job.on_done(result)
+            except Exception:
+                traceback.print_exc()  # A failing callback mustn't stop the other results from being delivered
+            finally:
+                if handled is not None:
+                    handled.set()
+
+        # Keep polling while jobs are running, even if a callback failed, or the tabs would wait forever
+        if self._latest:
+            self.widget.after(self.poll_interval, self._poll)
+        else:
+            self._polling = False
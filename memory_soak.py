@@ -0,0 +1,132 @@
+"""
+Soak test for long sessions: regenerates heatmaps and comparisons thousands of times and checks that the
+process' memory (RSS) levels off instead of growing with every generation.
+
+    python memory_soak.py --iterations 5000
+
+With a display, the real GUI code is driven (a weapon tab's view, canvas and worker); without one, the same
+compute and render steps run on an off-screen figure. Exits with 1 if RSS grew by more than --max-growth
+megabytes between the end of the warm-up and the end of the run.
+"""
+import argparse
+import os
+import resource
+import sys
+import time
+
+def rss_mb():
+    """Current resident set size in megabytes (the peak, where the current value can't be read)."""
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+def item_parameters(i, fine_grid):
+    # Cycle through more distinct items than the cache holds, so entries are evicted and rebuilt all the time
+    damage = 5 + i % 150
+    max_cdr = 10 + (i * 7) % 91  # Changing dimensions, so the mesh is replaced as well as updated
+    return damage, 1 + i % 3, 2 + i % 9, max_cdr, 30 if i % 2 else 60, 0.1 if fine_grid else 1
+
+def soak_headless(iterations, fine_grid, report):
+    """The generate and compare steps of the GUI, rendering into one reused off-screen figure per tab."""
+    import BazaarHeatmap
+    from heatmap_cache import default_cache, grid_key
+    from heatmap_render import HeatmapPlot, create_figure
+
+    plots = {tab_name: HeatmapPlot(create_figure(10)) for tab_name in ("Weapon 1", "Weapon 2", "Comparison Tab")}
+    for i in range(iterations):
+        tab_name = "Weapon 1" if i % 2 else "Weapon 2"
+        parameters = item_parameters(i // 2, fine_grid)
+        df = default_cache.get_frame(*parameters)
+        plots[tab_name].show_heatmap(df, df.values.min(), df.values.max())
+        plots[tab_name].fig.canvas.draw()
+        BazaarHeatmap.store_heatmap(tab_name, df, grid_key(*parameters))
+
+        if i % 10 == 9 and BazaarHeatmap.heatmap_data["Weapon 1"].shape == BazaarHeatmap.heatmap_data["Weapon 2"].shape:
+            absolute_damage = i % 20 == 19
+            comparison_df = BazaarHeatmap.comparison_nodes[absolute_damage].get()[0]
+            plots["Comparison Tab"].show_comparison(comparison_df, absolute_damage)
+            plots["Comparison Tab"].fig.canvas.draw()
+        report(i)
+
+def soak_gui(root, iterations, fine_grid, report):
+    """Drive generate_heatmap on a real tab (view, canvas, worker and hover), pumping Tk until each is shown."""
+    import tkinter as tk
+    from tkinter import ttk
+    import BazaarHeatmap
+    from heatmap_worker import HeatmapWorker
+
+    root.geometry("1000x900")
+    BazaarHeatmap.heatmap_worker = HeatmapWorker(root)
+    plot_frame = ttk.Frame(root)
+    plot_frame.pack(fill=tk.BOTH, expand=True)
+    entries = {name: ttk.Entry(root) for name in ("damage", "mult", "base_cooldown", "low_cap", "high_cap", "max_cdr")}
+    end_at_rope_var = tk.BooleanVar()
+    fine_grid_var = tk.BooleanVar(value=fine_grid)
+    error_label = ttk.Label(root)
+    status_label = ttk.Label(root)
+
+    for i in range(iterations):
+        damage, mult, base_cooldown, max_cdr, x_range, _ = item_parameters(i, fine_grid)
+        for name, value in (("damage", damage), ("mult", mult), ("base_cooldown", base_cooldown), ("max_cdr", max_cdr)):
+            entries[name].delete(0, tk.END)
+            entries[name].insert(0, value)
+        end_at_rope_var.set(x_range == 30)
+        BazaarHeatmap.generate_heatmap(
+            entries["damage"], entries["mult"], entries["base_cooldown"], error_label, plot_frame, "Weapon 1",
+            entries["low_cap"], entries["high_cap"], end_at_rope_var, entries["max_cdr"], fine_grid_var, status_label
+        )
+        while BazaarHeatmap.heatmap_worker.is_busy("Weapon 1"):
+            root.update()
+            time.sleep(0.001)
+        # Resize every so often, which must keep going through the tab's one resize handler
+        if i % 50 == 49:
+            root.geometry(f"{900 + i % 200}x900")
+        root.update()
+        report(i)
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that memory stays flat over thousands of heatmap generations.")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=None, help="Iterations before the reference RSS (default: a tenth)")
+    parser.add_argument("--fine-grid", action="store_true", help="Use 0.1 s and 0.1%% CDR steps")
+    parser.add_argument("--headless", action="store_true", help="Don't open a window even if a display is available")
+    parser.add_argument("--max-growth", type=float, default=20, help="Megabytes RSS may grow after the warm-up")
+    args = parser.parse_args()
+
+    warmup = args.warmup if args.warmup is not None else max(1, args.iterations // 10)
+    samples = []
+
+    def report(i):
+        if i + 1 == warmup or (i + 1) % max(1, args.iterations // 20) == 0 or i + 1 == args.iterations:
+            samples.append((i + 1, rss_mb()))
+            print(f"{i + 1:6} generations: RSS {samples[-1][1]:8.1f} MB", file=sys.stderr)
+
+    root = None
+    if not args.headless:
+        import tkinter as tk
+        try:
+            root = tk.Tk()
+        except tk.TclError:
+            print("No display available, running headless", file=sys.stderr)
+
+    start = time.perf_counter()
+    if root is not None:
+        soak_gui(root, args.iterations, args.fine_grid, report)
+        root.destroy()
+    else:
+        import matplotlib
+        matplotlib.use("Agg")
+        soak_headless(args.iterations, args.fine_grid, report)
+
+    reference = next(rss for iteration, rss in samples if iteration >= warmup)
+    growth = samples[-1][1] - reference
+    print(f"{args.iterations} generations in {time.perf_counter() - start:.1f} s, "
+          f"RSS grew {growth:+.1f} MB after the warm-up (limit {args.max_growth:g} MB)")
+    if growth > args.max_growth:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from heatmap_compute import duration_axis, net_cooldown
+
+# Stochastic variables that can be mapped to the y-axis (all given in percent, like CDR)
+Y_VARIABLES = ("cdr", "crit_chance", "haste_uptime")
+
+def simulate_row(damage, mult, base_cooldown, durations, cdr=0, crit_chance=0, haste_uptime=0, crit_multiplier=2,
+                 seed=None, batch_size=512, max_trials=4000, tolerance=None, percentiles=(5, 50, 95)):
+    """
+    Simulate combat for one row of the heatmap: many trials, every duration at once.
+    Each trial shares one timeline across all durations, so the damage dealt by each duration is read off
+    the same sequence of fires. Trials run in batches as NumPy arrays; if tolerance is given, batches stop
+    once the standard error of the mean is within tolerance (relative) of the mean for every duration.
+
+    Model: the item fires every net cooldown (CDR applied as in calculate_value). Each cooldown cycle is hasted
+    (charges twice as fast) with probability haste_uptime, and each of the mult hits of a fire crits
+    independently with probability crit_chance, dealing crit_multiplier times the damage.
+    Returns (mean, percentile values, number of trials) for the row.
+    """
+    rng = np.random.default_rng(seed)
+    durations = np.asarray(durations, dtype=np.float64)
+    crit_chance = crit_chance / 100
+    haste_uptime = haste_uptime / 100
+
+    # Durations measured in (unhasted) cooldown cycles; a hasted cycle only takes half a unit
+    limit = durations / net_cooldown(base_cooldown, cdr)
+    max_fires = int(np.floor(limit.max() / (0.5 if haste_uptime > 0 else 1))) + 1
+    columns = len(durations)
+
+    batches = []
+    trials = 0
+    total = np.zeros(columns)  # Running sums for the convergence check
+    total_squares = np.zeros(columns)
+    while trials < max_trials:
+        n = min(batch_size, max_trials - trials)
+
+        # Fire times (in cycles) and damage of every fire, for n trials at once
+        if haste_uptime > 0:
+            cycles = np.where(rng.random((n, max_fires)) < haste_uptime, 0.5, 1.0)
+        else:
+            cycles = np.ones((n, max_fires))
+        fire_at = np.cumsum(cycles, axis=1)
+        if crit_chance > 0:
+            crit_hits = rng.binomial(mult, crit_chance, size=(n, max_fires))
+        else:
+            crit_hits = np.zeros((n, max_fires))
+        cumulative_damage = np.zeros((n, max_fires + 1))
+        np.cumsum(damage * (mult + crit_hits * (crit_multiplier - 1)), axis=1, out=cumulative_damage[:, 1:])
+
+        # Number of fires within each duration: find the first duration each fire lands in, then count
+        first_column = np.searchsorted(limit, fire_at, side="left")  # columns == fired after the last duration
+        offsets = (np.arange(n) * (columns + 1))[:, np.newaxis]
+        fired = np.bincount((first_column + offsets).ravel(), minlength=n * (columns + 1))
+        fired = np.cumsum(fired.reshape(n, columns + 1)[:, :columns], axis=1)
+
+        batch = np.take_along_axis(cumulative_damage, fired, axis=1)
+        batches.append(batch)
+        trials += n
+
+        if tolerance is not None:
+            total += batch.sum(axis=0)
+            total_squares += np.square(batch).sum(axis=0)
+            mean = total / trials
+            variance = np.maximum(total_squares / trials - np.square(mean), 0)
+            standard_error = np.sqrt(variance / trials)
+            if np.all(standard_error <= tolerance * np.abs(mean)):
+                break  # Converged for every duration
+
+    samples = np.concatenate(batches) if len(batches) > 1 else batches[0]
+    return samples.mean(axis=0), np.percentile(samples, percentiles, axis=0), trials
+
+def _simulate_row_task(task):
+    kwargs, y_variable, y_value = task
+    kwargs = dict(kwargs, **{y_variable: y_value})
+    return simulate_row(**kwargs)
+
+def simulate_grid(damage, mult, base_cooldown, x_range, y_variable="crit_chance", y_max=100, y_step=1,
+                  cdr=0, crit_chance=0, haste_uptime=0, crit_multiplier=2, duration_step=1, seed=0,
+                  batch_size=512, max_trials=4000, tolerance=None, percentiles=(5, 50, 95), workers=None):
+    """
+    Monte Carlo version of the heatmap grid, with y_variable ("cdr", "crit_chance" or "haste_uptime", in percent)
+    on the y-axis from y_max at the top down to 0, and combat duration on the x-axis. The other variables are
+    held at the values given. Rows are simulated independently with their own seed derived from seed, so the
+    results are reproducible whether or not they are spread over a process pool (workers > 1).
+
+    Returns a dict with the "mean" grid, a "percentiles" dict of grids and the number of "trials" run per row.
+    Grids are DataFrames indexed like heatmap_frame, so HeatmapPlot.show_heatmap can plot them directly.
+    """
+    if y_variable not in Y_VARIABLES:
+        raise ValueError(f"y_variable must be one of {', '.join(Y_VARIABLES)}.")
+
+    y_values = np.round(np.arange(int(round(y_max / y_step)), -1, -1) * y_step, 9)
+    durations = duration_axis(x_range, duration_step)
+    seeds = np.random.SeedSequence(seed).spawn(len(y_values))
+    base_kwargs = dict(
+        damage=damage, mult=mult, base_cooldown=base_cooldown, durations=durations, cdr=cdr,
+        crit_chance=crit_chance, haste_uptime=haste_uptime, crit_multiplier=crit_multiplier,
+        batch_size=batch_size, max_trials=max_trials, tolerance=tolerance, percentiles=percentiles
+    )
+    tasks = [(dict(base_kwargs, seed=row_seed), y_variable, y_value) for row_seed, y_value in zip(seeds, y_values)]
+
+    if workers is not None and workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            rows = list(executor.map(_simulate_row_task, tasks, chunksize=max(1, len(tasks) // (workers * 4))))
+    else:
+        rows = [_simulate_row_task(task) for task in tasks]
+
+    mean = pd.DataFrame(np.array([row[0] for row in rows]), index=y_values, columns=durations)
+    percentile_grids = {
+        percentile: pd.DataFrame(np.array([row[1][i] for row in rows]), index=y_values, columns=durations)
+        for i, percentile in enumerate(percentiles)
+    }
+    trials = np.array([row[2] for row in rows])
+    return {"mean": mean, "percentiles": percentile_grids, "trials": trials}
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo heatmap with crit chance, haste uptime or CDR on the y-axis.")
+    parser.add_argument("output", help="PNG file to write the heatmap of the mean damage to")
+    parser.add_argument("--damage", type=float, required=True)
+    parser.add_argument("--mult", type=int, default=1)
+    parser.add_argument("--base-cooldown", type=float, required=True)
+    parser.add_argument("--y", dest="y_variable", choices=Y_VARIABLES, default="crit_chance")
+    parser.add_argument("--y-max", type=float, default=100, help="Top of the y-axis, in percent")
+    parser.add_argument("--cdr", type=float, default=0, help="CDR in percent (when not on the y-axis)")
+    parser.add_argument("--crit-chance", type=float, default=0, help="Crit chance in percent (when not on the y-axis)")
+    parser.add_argument("--haste-uptime", type=float, default=0, help="Haste uptime in percent (when not on the y-axis)")
+    parser.add_argument("--end-at-storm", action="store_true", help="Limit the x-axis to 30 seconds")
+    parser.add_argument("--percentile", type=float, default=None, help="Plot this percentile instead of the mean")
+    parser.add_argument("--trials", type=int, default=4000, help="Maximum number of trials per row")
+    parser.add_argument("--tolerance", type=float, default=None, help="Stop early once the relative standard error is below this")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes")
+    args = parser.parse_args()
+
+    percentiles = (5, 50, 95) if args.percentile is None else (args.percentile,)
+    result = simulate_grid(
+        args.damage, args.mult, args.base_cooldown, 30 if args.end_at_storm else 60,
+        y_variable=args.y_variable, y_max=args.y_max, cdr=args.cdr, crit_chance=args.crit_chance,
+        haste_uptime=args.haste_uptime, seed=args.seed, max_trials=args.trials, tolerance=args.tolerance,
+        percentiles=percentiles, workers=args.workers
+    )
+    grid = result["mean"] if args.percentile is None else result["percentiles"][args.percentile]
+
+    from heatmap_render import HeatmapPlot, create_figure
+    plot = HeatmapPlot(create_figure(10))
+    plot.show_heatmap(grid, grid.values.min(), grid.values.max())
+    plot.ax.set_ylabel(args.y_variable.replace("_", " ").title())
+    plot.fig.savefig(args.output, bbox_inches="tight")
+    print(f"Wrote {args.output} ({result['trials'].sum()} trials)")
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,20 @@
+import argparse
+import csv
+import json
 import sqlite3
 import os
 import sys
+import threading
+
+# Columns of the presets table, in order (after the id column)
+PRESET_COLUMNS = ("name", "damage", "mult", "base_cooldown", "low_cap", "high_cap", "max_cdr")
+
+# One connection shared by every caller, plus an in-memory copy of the table that is dropped on every write
+_connection = None
+_database_path = None  # None means presets.db next to the script
+_connection_lock = threading.Lock()
+_presets = None
+_presets_by_name = None
 
 def get_resource_path(relative_path):
     """Get the absolute path to a resource, whether running as a script or as a PyInstaller bundle."""
@@ -13,28 +27,144 @@ def initialize_database():
     # Skip database initialization to prevent creating a new file
     print("Database initialization skipped in read-only mode.")
 
+def set_database_path(path):
+    """Use a different database file (e.g a scaled-up copy for benchmarking). None goes back to presets.db."""
+    global _database_path
+    close_connection()
+    _database_path = path
+
+def get_connection():
+    """Open presets.db on first use and keep the connection for the rest of the session."""
+    global _connection
+    with _connection_lock:
+        if _connection is None:
+            path = _database_path if _database_path is not None else get_resource_path("presets.db")
+            _connection = sqlite3.connect(path, check_same_thread=False)
+            ensure_name_index(_connection)
+        return _connection
+
+def close_connection():
+    global _connection
+    with _connection_lock:
+        if _connection is not None:
+            _connection.close()
+            _connection = None
+    invalidate_cache()
+
+def ensure_name_index(conn):
+    """
+    Make sure lookups by name are indexed. The UNIQUE constraint on name already creates one, so this only
+    writes to the database if it is missing (e.g an older presets.db).
+    """
+    for index in conn.execute("PRAGMA index_list(presets)").fetchall():
+        _, index_name, unique = index[:3]
+        columns = [info[2] for info in conn.execute(f"PRAGMA index_info('{index_name}')").fetchall()]
+        if unique and columns == ["name"]:
+            return
+    with conn:
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_presets_name ON presets (name)")
+
+def invalidate_cache():
+    """Forget the in-memory copy of the presets table, so the next read goes to the database."""
+    global _presets, _presets_by_name
+    _presets = None
+    _presets_by_name = None
+
 def insert_preset(name, damage, mult, base_cooldown, low_cap, high_cap, max_cdr):
-    db_path = get_resource_path("presets.db")
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
+    conn = get_connection()
 
     # Insert a new preset
-    cursor.execute("""
-        INSERT INTO presets (name, damage, mult, base_cooldown, low_cap, high_cap, max_cdr)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    """, (name, damage, mult, base_cooldown, low_cap, high_cap, max_cdr))
-
-    conn.commit()
-    conn.close()
+    with _connection_lock, conn:
+        conn.execute("""
+            INSERT INTO presets (name, damage, mult, base_cooldown, low_cap, high_cap, max_cdr)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (name, damage, mult, base_cooldown, low_cap, high_cap, max_cdr))
+    invalidate_cache()
 
 def fetch_all_presets():
-    db_path = get_resource_path("presets.db")
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
+    global _presets, _presets_by_name
+    if _presets is None:
+        conn = get_connection()
+
+        # Fetch all presets
+        with _connection_lock:
+            presets = conn.execute("SELECT * FROM presets").fetchall()
+        _presets_by_name = {preset[1]: preset for preset in presets}
+        _presets = presets
+    return _presets
+
+def fetch_preset(name):
+    """Look up a single preset row by name, or None if there is no such preset."""
+    fetch_all_presets()
+    return _presets_by_name.get(name)
+
+def _normalize_cap(value):
+    # Blank caps are stored as empty strings, like the existing presets
+    return "" if value is None or value == "" else float(value)
+
+def import_presets(path):
+    """
+    Insert or update presets from a CSV or JSON file in a single transaction.
+    CSV files need a header with the PRESET_COLUMNS; JSON files hold a list of objects with those keys.
+    Existing presets with the same name are overwritten. Returns the number of rows imported.
+    """
+    with open(path, newline="", encoding="utf-8") as file:
+        if path.lower().endswith(".json"):
+            records = json.load(file)
+        else:
+            records = list(csv.DictReader(file))
+
+    rows = [
+        (
+            record["name"],
+            float(record["damage"]),
+            int(record["mult"]),
+            float(record["base_cooldown"]),
+            _normalize_cap(record.get("low_cap")),
+            _normalize_cap(record.get("high_cap")),
+            int(record["max_cdr"]),
+        )
+        for record in records
+    ]
+
+    conn = get_connection()
+    with _connection_lock, conn:
+        conn.executemany("""
+            INSERT INTO presets (name, damage, mult, base_cooldown, low_cap, high_cap, max_cdr)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (name) DO UPDATE SET
+                damage = excluded.damage,
+                mult = excluded.mult,
+                base_cooldown = excluded.base_cooldown,
+                low_cap = excluded.low_cap,
+                high_cap = excluded.high_cap,
+                max_cdr = excluded.max_cdr
+        """, rows)
+    invalidate_cache()
+    return len(rows)
+
+def export_presets(path):
+    """Write every preset to a CSV or JSON file (chosen by extension). Returns the number of rows exported."""
+    records = [dict(zip(PRESET_COLUMNS, preset[1:])) for preset in fetch_all_presets()]
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        if path.lower().endswith(".json"):
+            json.dump(records, file, indent=2)
+        else:
+            writer = csv.DictWriter(file, fieldnames=PRESET_COLUMNS)
+            writer.writeheader()
+            writer.writerows(records)
+    return len(records)
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import or export the presets in presets.db.")
+    parser.add_argument("action", choices=["import", "export"])
+    parser.add_argument("path", help="CSV or JSON file (chosen by extension)")
+    args = parser.parse_args()
 
-    # Fetch all presets
-    cursor.execute("SELECT * FROM presets")
-    presets = cursor.fetchall()
+    if args.action == "import":
+        print(f"Imported {import_presets(args.path)} presets from {args.path}")
+    else:
+        print(f"Exported {export_presets(args.path)} presets to {args.path}")
 
-    conn.close()
-    return presets
+if __name__ == "__main__":
+    main()
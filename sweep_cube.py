@@ -0,0 +1,184 @@
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from heatmap_compute import cdr_axis, duration_axis
+
+# The cube sweeps base cooldown x CDR x duration x mult. Damage and mult only scale the result
+# (calculate_value is damage * mult * hits), so only the hit counts are stored on disk, as a
+# (base cooldown, CDR, duration) array; mult is applied when a slice is read, the same way as damage.
+AXES = ("base_cooldown", "cdr", "duration", "mult")
+STORED_AXES = AXES[:3]
+
+AXIS_LABELS = {
+    "base_cooldown": "Base Cooldown (seconds)",
+    "cdr": "CDR",
+    "duration": "Combat Duration (seconds)",
+    "mult": "Mult",
+}
+
+def hit_counts(base_cooldowns, cdr_values, durations):
+    """
+    Number of times an item fires for every (base cooldown, CDR, duration), as a uint16 array.
+    Uses the same cooldown and floor as calculate_rows, so damage * mult * hits matches the heatmaps.
+    """
+    base_cooldown = np.asarray(base_cooldowns, dtype=np.float64)[:, np.newaxis, np.newaxis]
+    y = np.asarray(cdr_values)[np.newaxis, :, np.newaxis] / 100
+    x = np.asarray(durations)[np.newaxis, np.newaxis, :]
+    cooldown_mod = (1 - np.minimum(((base_cooldown - 1) / base_cooldown), y))
+    net_cooldown = base_cooldown * cooldown_mod
+    return np.floor(x / net_cooldown).astype(np.uint16)
+
+def _compute_chunk(task):
+    """Fill the hit counts of base cooldowns [start, stop) in the cube file. Runs inside a worker process."""
+    path, start, stop = task
+    with open(os.path.join(path, "axes.json"), encoding="utf-8") as file:
+        axes = json.load(file)
+    hits = np.load(os.path.join(path, "hits.npy"), mmap_mode="r+")
+    hits[start:stop] = hit_counts(axes["base_cooldown"][start:stop], axes["cdr"], axes["duration"])
+    hits.flush()
+    return stop - start
+
+def build_cube(path, base_cooldowns, max_cdr=100, x_range=60, step=1, mults=(1, 2, 3, 4), workers=None, chunk_size=None):
+    """
+    Compute the sweep cube into the directory path: hits.npy (memory-mapped, filled chunk by chunk of base
+    cooldowns in a process pool) and axes.json (the values along every axis). Returns the opened SweepCube.
+    """
+    os.makedirs(path, exist_ok=True)
+    axes = {
+        "base_cooldown": [float(value) for value in base_cooldowns],
+        "cdr": cdr_axis(max_cdr, step).tolist(),
+        "duration": duration_axis(x_range, step).tolist(),
+        "mult": [int(value) for value in mults],
+    }
+    with open(os.path.join(path, "axes.json"), "w", encoding="utf-8") as file:
+        json.dump(axes, file)
+
+    shape = tuple(len(axes[axis]) for axis in STORED_AXES)
+    hits = np.lib.format.open_memmap(os.path.join(path, "hits.npy"), mode="w+", dtype=np.uint16, shape=shape)
+    del hits  # Only create the file, every worker maps it itself
+
+    # Chunks of whole base cooldowns keep each worker's writes contiguous in the file
+    worker_count = workers or os.cpu_count() or 1
+    chunk_size = chunk_size or max(1, -(-shape[0] // (worker_count * 4)))
+    tasks = [(path, start, min(start + chunk_size, shape[0])) for start in range(0, shape[0], chunk_size)]
+    if worker_count > 1:
+        with ProcessPoolExecutor(max_workers=worker_count) as executor:
+            list(executor.map(_compute_chunk, tasks))
+    else:
+        for task in tasks:
+            _compute_chunk(task)
+    return SweepCube(path)
+
+class SweepCube:
+    """
+    A sweep cube built by build_cube, memory-mapped read-only. Slices only read the part of the file
+    they need, so the cube never has to fit in memory.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "axes.json"), encoding="utf-8") as file:
+            self.axes = {axis: np.array(values) for axis, values in json.load(file).items()}
+        self.hits = np.load(os.path.join(path, "hits.npy"), mmap_mode="r")
+
+    def index(self, axis, value):
+        """Position of value along axis; raises ValueError if the cube wasn't built with it."""
+        matches = np.flatnonzero(np.isclose(self.axes[axis], value))
+        if not matches.size:
+            raise ValueError(f"The sweep cube has no {AXIS_LABELS[axis]} of {value:g}.")
+        return int(matches[0])
+
+    def frame(self, y, x, damage=1, **fixed):
+        """
+        A 2-D slice of expected damage as a DataFrame, with the values of axis y as its index (largest at the
+        top, like the CDR heatmaps) and those of axis x as its columns. Every other axis needs a value in fixed,
+        e.g frame("base_cooldown", "duration", damage=8, cdr=20, mult=1).
+        """
+        if y == x or y not in AXES or x not in AXES:
+            raise ValueError(f"The y and x axes must be two different ones of {', '.join(AXES)}.")
+        for axis in AXES:
+            if axis not in (y, x) and axis not in fixed:
+                raise ValueError(f"A value for {AXIS_LABELS[axis]} is needed.")
+
+        # Read only the slice: whole stored axes that are shown, one position along the others
+        selection = tuple(slice(None) if axis in (y, x) else self.index(axis, fixed[axis]) for axis in STORED_AXES)
+        shown = [axis for axis in STORED_AXES if axis in (y, x)]
+        values = np.asarray(self.hits[selection], dtype=np.float64)
+
+        # Apply damage and mult: one fixed mult scales everything, a mult axis adds a dimension
+        if "mult" in (y, x):
+            values = self.axes["mult"][:, np.newaxis] * values[np.newaxis, :]
+            shown = ["mult"] + shown
+        else:
+            values = values * self.axes["mult"][self.index("mult", fixed["mult"])]
+        values = damage * values
+        if shown != [y, x]:
+            values = values.T
+
+        y_values = self.axes[y]
+        x_values = self.axes[x]
+        if y_values[0] < y_values[-1]:
+            values, y_values = values[::-1], y_values[::-1]
+        if x_values[0] > x_values[-1]:
+            values, x_values = values[:, ::-1], x_values[::-1]
+        return pd.DataFrame(
+            values,
+            index=pd.Index(y_values, name=y),
+            columns=pd.Index(x_values, name=x)
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a base cooldown x CDR x duration x mult sweep cube, or plot a slice of one.")
+    subparsers = parser.add_subparsers(dest="action", required=True)
+
+    build = subparsers.add_parser("build", help="Compute a sweep cube into a directory")
+    build.add_argument("path", help="Directory to write the cube to")
+    build.add_argument("--base-cooldowns", type=float, nargs=3, default=(1, 20, 0.5), metavar=("MIN", "MAX", "STEP"),
+                       help="Range of base cooldowns in seconds (default: 1 to 20 in steps of 0.5)")
+    build.add_argument("--mults", type=int, nargs="+", default=[1, 2, 3, 4])
+    build.add_argument("--max-cdr", type=int, default=100)
+    build.add_argument("--end-at-storm", action="store_true", help="Limit durations to 30 seconds")
+    build.add_argument("--fine-grid", action="store_true", help="Use 0.1 s and 0.1%% CDR steps")
+    build.add_argument("--workers", type=int, default=None, help="Number of worker processes (default: all cores)")
+
+    plot_slice = subparsers.add_parser("slice", help="Plot a 2-D slice of a sweep cube")
+    plot_slice.add_argument("path", help="Directory of the cube")
+    plot_slice.add_argument("output", help="PNG file to write")
+    plot_slice.add_argument("--y", choices=AXES, default="cdr")
+    plot_slice.add_argument("--x", choices=AXES, default="duration")
+    plot_slice.add_argument("--damage", type=float, default=1)
+    for axis in AXES:
+        plot_slice.add_argument(f"--{axis.replace('_', '-')}", type=float, default=None,
+                                help="Value to slice at (when not on an axis)")
+    args = parser.parse_args()
+
+    if args.action == "build":
+        low, high, step = args.base_cooldowns
+        base_cooldowns = np.round(np.arange(low, high + step / 2, step), 9)
+        cube = build_cube(
+            args.path, base_cooldowns, args.max_cdr, 30 if args.end_at_storm else 60,
+            0.1 if args.fine_grid else 1, args.mults, args.workers
+        )
+        print(f"Wrote a {' x '.join(map(str, cube.hits.shape))} x {len(cube.axes['mult'])} cube to {args.path}")
+        return
+
+    cube = SweepCube(args.path)
+    fixed = {axis: getattr(args, axis) for axis in AXES if getattr(args, axis) is not None}
+    try:
+        df = cube.frame(args.y, args.x, args.damage, **fixed)
+    except ValueError as e:
+        parser.error(str(e))
+
+    from heatmap_render import HeatmapPlot, create_figure
+    plot = HeatmapPlot(create_figure(10))
+    plot.show_slice(df, df.values.min(), df.values.max(), AXIS_LABELS[args.y], AXIS_LABELS[args.x])
+    plot.fig.savefig(args.output, bbox_inches="tight")
+    print(f"Wrote {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from crossover import cdr_crossovers, duration_crossovers
+from heatmap_compute import calculate_grid, cdr_axis, duration_axis, net_cooldown
+
+PAIRS = [
+    ((8, 1, 3), (12, 1, 5)),
+    ((12.5, 2, 7), (30, 1, 4.5)),
+    ((10, 1, 2), (20, 1, 4)),  # Same damage per second, item 1 gets ahead between item 2's hits
+    ((6, 2, 3), (4, 3, 3)),  # Same damage per hit and cooldown: a tie everywhere
+    ((9, 1, 1.5), (18, 1, 3)),  # Same damage per second, reaching the 1 second cooldown cap at different CDR
+]
+
+def winner_at(intervals, position):
+    for low, high, winner in intervals:
+        if low <= position < high:
+            return winner
+    return intervals[-1][2]  # The last interval includes its end
+
+def grid_winners(grid1, grid2):
+    difference = grid1 - grid2
+    tolerance = 1e-9 * np.maximum(np.abs(grid1), np.abs(grid2))
+    return np.where(difference > tolerance, 1, np.where(difference < -tolerance, 2, 0))
+
+def near_step(duration, cooldown):
+    # Where an item fires, the floating point floor count may land on either side of the exact step
+    hits = duration / cooldown
+    return abs(hits - round(hits)) < 1e-6
+
+@pytest.mark.parametrize("item1, item2", PAIRS)
+def test_duration_crossovers_match_floor_count_grid(item1, item2):
+    max_cdr, x_range, step = 100, 30, 0.1
+    winners = grid_winners(calculate_grid(*item1, max_cdr, x_range, step, step), calculate_grid(*item2, max_cdr, x_range, step, step))
+    for row, cdr in enumerate(cdr_axis(max_cdr, step)[::25]):
+        intervals = duration_crossovers(item1, item2, cdr, x_range)
+        cooldowns = net_cooldown(item1[2], cdr), net_cooldown(item2[2], cdr)
+        for column, duration in enumerate(duration_axis(x_range, step)):
+            if any(near_step(duration, cooldown) for cooldown in cooldowns):
+                continue
+            assert winner_at(intervals, duration) == winners[row * 25, column], (cdr, duration)
+
+@pytest.mark.parametrize("item1, item2", PAIRS)
+def test_cdr_crossovers_match_floor_count_grid(item1, item2):
+    max_cdr, x_range, step = 100, 30, 0.1
+    winners = grid_winners(calculate_grid(*item1, max_cdr, x_range, step, step), calculate_grid(*item2, max_cdr, x_range, step, step))
+    cdr_values = cdr_axis(max_cdr, step)
+    for column, duration in enumerate(duration_axis(x_range, step)[::7]):
+        intervals = cdr_crossovers(item1, item2, duration, max_cdr)
+        for row, cdr in enumerate(cdr_values):
+            if any(near_step(duration, net_cooldown(item[2], cdr)) for item in (item1, item2)):
+                continue
+            assert winner_at(intervals, cdr) == winners[row, column * 7], (cdr, duration)
+
+def test_equal_items_tie_everywhere():
+    assert duration_crossovers((6, 2, 3), (4, 3, 3), 20) == [(0, 60, 0)]
+    assert cdr_crossovers((6, 2, 3), (4, 3, 3), 20) == [(0, 100, 0)]
+
+def test_equal_damage_per_second_alternates_exactly():
+    # 10 every 2 s against 20 every 4 s: item 1 leads from each odd multiple of 2 s until item 2 catches up
+    intervals = duration_crossovers((10, 1, 2), (20, 1, 4), 0, 12)
+    assert intervals == [(0, 2.0, 0), (2.0, 4.0, 1), (4.0, 6.0, 0), (6.0, 8.0, 1), (8.0, 10.0, 0), (10.0, 12.0, 1), (12.0, 12, 0)]
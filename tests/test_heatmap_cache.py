@@ -0,0 +1,95 @@
+import os
+
+import numpy as np
+
+from heatmap_cache import HeatmapCache, grid_key
+from heatmap_compute import calculate_grid
+
+def test_key_normalises_numbers():
+    assert grid_key(5, 1, 3, 50, 60) == grid_key(5.0, 1.0, 3.0, 50.0, 60.0, 1.0)
+
+def test_hit_returns_the_same_grid():
+    cache = HeatmapCache()
+    grid = cache.get_grid(8, 1, 3, 50, 60)
+    assert cache.get_grid(8.0, 1, 3, 50, 60) is grid
+    assert (cache.hits, cache.misses) == (1, 1)
+    np.testing.assert_allclose(grid, calculate_grid(8, 1, 3, 50, 60), rtol=1e-6)
+
+def test_evicts_least_recently_used_by_entry_count():
+    cache = HeatmapCache(max_entries=2)
+    first = cache.get_grid(1, 1, 3, 50, 60)
+    cache.get_grid(2, 1, 3, 50, 60)
+    assert cache.get_grid(1, 1, 3, 50, 60) is first  # Now the most recently used
+    cache.get_grid(3, 1, 3, 50, 60)  # Evicts damage 2
+    assert cache.has_grid(1, 1, 3, 50, 60) and cache.has_grid(3, 1, 3, 50, 60)
+    assert not cache.has_grid(2, 1, 3, 50, 60)
+    assert cache.size == 2 * first.nbytes
+
+def test_relative_difference_is_cached():
+    cache = HeatmapCache()
+    key1, key2 = grid_key(8, 1, 3, 50, 60), grid_key(12, 1, 5, 50, 60)
+    comparison, max_positive, max_negative = cache.get_relative_difference(key1, key2)
+    misses = cache.misses
+    assert cache.get_relative_difference(key1, key2)[0] is comparison
+    assert cache.misses == misses
+    assert isinstance(max_positive, float) and isinstance(max_negative, float)
+
+def test_entries_round_trip_through_cache_dir(tmp_path):
+    cache = HeatmapCache(cache_dir=str(tmp_path))
+    grid = cache.get_grid(8, 2, 3, 50, 60, 0.1)
+    comparison, max_positive, max_negative = cache.get_relative_difference(grid_key(8, 2, 3, 50, 60, 0.1), grid_key(12, 1, 5, 50, 60, 0.1))
+    assert len([name for name in os.listdir(tmp_path) if name.endswith(".npz")]) == 3
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+    # A new cache (e.g after a restart) loads the entries instead of computing them
+    restarted = HeatmapCache(cache_dir=str(tmp_path))
+    loaded = restarted.get_grid(8, 2, 3, 50, 60, 0.1)
+    assert restarted.misses == 0
+    assert loaded.dtype == grid.dtype and not loaded.flags.writeable
+    np.testing.assert_array_equal(loaded, grid)
+    loaded_comparison, loaded_positive, loaded_negative = restarted.get_relative_difference(
+        grid_key(8, 2, 3, 50, 60, 0.1), grid_key(12, 1, 5, 50, 60, 0.1))
+    np.testing.assert_array_equal(loaded_comparison, comparison)
+    np.testing.assert_equal((loaded_positive, loaded_negative), (max_positive, max_negative))
+    assert restarted.misses == 0
+
+def test_unreadable_cache_file_is_recomputed(tmp_path):
+    cache = HeatmapCache(cache_dir=str(tmp_path))
+    grid = cache.get_grid(8, 1, 3, 50, 60)
+    for name in os.listdir(tmp_path):
+        with open(tmp_path / name, "wb") as file:
+            file.write(b"not an npz file")
+    restarted = HeatmapCache(cache_dir=str(tmp_path))
+    np.testing.assert_array_equal(restarted.get_grid(8, 1, 3, 50, 60), grid)
+    assert restarted.misses == 1
+
+def test_grids_are_float32_and_read_only():
+    cache = HeatmapCache()
+    grid = cache.get_grid(8, 1, 3, 50, 60)
+    comparison, _, _ = cache.get_relative_difference(grid_key(8, 1, 3, 50, 60), grid_key(12, 1, 5, 50, 60))
+    assert grid.dtype == np.float32
+    assert not grid.flags.writeable and not comparison.flags.writeable
+
+def test_evicts_by_size():
+    grid_bytes = HeatmapCache().get_grid(1, 1, 3, 100, 60, 0.1).nbytes
+    cache = HeatmapCache(max_bytes=int(grid_bytes * 2.5))
+    for damage in (1, 2, 3):
+        cache.get_grid(damage, 1, 3, 100, 60, 0.1)
+    assert not cache.has_grid(1, 1, 3, 100, 60, 0.1)
+    assert cache.has_grid(2, 1, 3, 100, 60, 0.1) and cache.has_grid(3, 1, 3, 100, 60, 0.1)
+    assert cache.size == 2 * grid_bytes <= cache.max_bytes
+
+def test_entry_larger_than_max_bytes_is_still_kept():
+    cache = HeatmapCache(max_bytes=1)
+    grid = cache.get_grid(1, 1, 3, 50, 60)
+    assert cache.get_grid(1, 1, 3, 50, 60) is grid  # The latest entry is never evicted
+    cache.get_grid(2, 1, 3, 50, 60)
+    assert not cache.has_grid(1, 1, 3, 50, 60)
+    assert cache.size == grid.nbytes
+
+def test_put_grid_is_stored_as_float32():
+    cache = HeatmapCache()
+    grid = cache.put_grid(calculate_grid(8, 1, 3, 80, 60), 8, 1, 3, 80, 60)
+    assert grid.dtype == np.float32 and not grid.flags.writeable
+    assert cache.get_grid(8, 1, 3, 80, 60) is grid
+    assert cache.misses == 1
@@ -0,0 +1,85 @@
+import math
+
+import numpy as np
+import pytest
+
+from heatmap_compute import calculate_grid, calculate_value, cdr_axis, change_max_cdr, duration_axis, relative_difference
+
+ITEMS = [(8, 1, 3), (12.5, 2, 7), (30, 1, 1), (5, 3, 0.5), (100, 1, 9.3)]  # (damage, mult, base_cooldown)
+
+def scalar_grid(damage, mult, base_cooldown, max_cdr, x_range, step=1):
+    return np.array([
+        [calculate_value(y, x, damage, mult, base_cooldown) for x in duration_axis(x_range, step)]
+        for y in cdr_axis(max_cdr, step)
+    ])
+
+def per_cell_relative_difference(grid1, grid2):
+    # The original per-cell loop of the comparison tab, with NaN where it skipped a cell
+    rows, columns = grid1.shape
+    comparison = np.full((rows, columns), np.nan)
+    for i in range(rows):
+        for j in range(columns):
+            val1, val2 = grid1[i, j], grid2[i, j]
+            if val1 == 0 and val2 == 0:
+                comparison[i, j] = 0
+            elif val1 == 0 or val2 == 0:
+                continue
+            elif val1 > val2:
+                comparison[i, j] = (val1 - val2) / val2
+            else:
+                comparison[i, j] = -1 * (val2 - val1) / val1
+    positive = comparison[comparison > 0]
+    negative = comparison[comparison < 0]
+    max_positive = positive.max() if positive.size else np.nan
+    max_negative = negative.min() if negative.size else np.nan
+    for i in range(rows):
+        for j in range(columns):
+            if math.isnan(comparison[i, j]):
+                if grid1[i, j] == 0:
+                    comparison[i, j] = max_negative * 1.01
+                elif grid2[i, j] == 0:
+                    comparison[i, j] = max_positive * 1.01
+    return comparison, max_positive, max_negative
+
+@pytest.mark.parametrize("item", ITEMS)
+@pytest.mark.parametrize("max_cdr, x_range, step", [(50, 60, 1), (100, 30, 1), (20, 10, 0.1)])
+def test_calculate_grid_matches_calculate_value(item, max_cdr, x_range, step):
+    grid = calculate_grid(*item, max_cdr, x_range, step, step)
+    expected = scalar_grid(*item, max_cdr, x_range, step)
+    assert grid.shape == (int(round(max_cdr / step)) + 1, int(round(x_range / step)))
+    np.testing.assert_allclose(grid, expected, rtol=1e-12, atol=1e-9)
+
+def test_relative_difference_matches_per_cell_semantics():
+    for item1, item2 in [(ITEMS[0], ITEMS[1]), (ITEMS[1], ITEMS[0]), (ITEMS[2], ITEMS[4]), (ITEMS[3], ITEMS[3])]:
+        grid1 = calculate_grid(*item1, 50, 30)
+        grid2 = calculate_grid(*item2, 50, 30)
+        comparison, max_positive, max_negative = relative_difference(grid1, grid2)
+        expected, expected_positive, expected_negative = per_cell_relative_difference(grid1, grid2)
+        np.testing.assert_allclose(comparison, expected, rtol=1e-12)
+        np.testing.assert_equal([max_positive, max_negative], [expected_positive, expected_negative])
+
+def test_relative_difference_zero_cells_and_fill():
+    grid1 = np.array([[0.0, 0.0, 4.0, 2.0], [6.0, 0.0, 3.0, 1.0]])
+    grid2 = np.array([[0.0, 5.0, 0.0, 4.0], [2.0, 0.0, 3.0, 2.0]])
+    comparison, max_positive, max_negative = relative_difference(grid1, grid2)
+    assert max_positive == 2.0  # 6 vs 2
+    assert max_negative == -1.0  # 2 vs 4 and 1 vs 2
+    expected = [[0.0, -1.01, 2.02, -1.0], [2.0, 0.0, 0.0, -1.0]]
+    np.testing.assert_allclose(comparison, expected)
+    np.testing.assert_allclose(comparison, per_cell_relative_difference(grid1, grid2)[0])
+
+def test_relative_difference_fill_without_same_sign_values_is_nan():
+    # Only grid2 ever deals damage, so there is no negative ratio to scale
+    comparison, max_positive, max_negative = relative_difference(np.zeros((1, 2)), np.array([[0.0, 3.0]]))
+    assert comparison[0, 0] == 0
+    assert np.isnan(comparison[0, 1]) and np.isnan(max_positive) and np.isnan(max_negative)
+
+@pytest.mark.parametrize("item", ITEMS)
+@pytest.mark.parametrize("step", [1, 0.1])
+@pytest.mark.parametrize("max_cdr, new_max_cdr", [(50, 80), (50, 100), (80, 30), (50, 10), (40, 40)])
+def test_change_max_cdr_matches_fresh_grid(item, step, max_cdr, new_max_cdr):
+    grid = calculate_grid(*item, max_cdr, 30, step, step).astype(np.float32)
+    changed = change_max_cdr(grid, *item, max_cdr, new_max_cdr, 30, step)
+    fresh = calculate_grid(*item, new_max_cdr, 30, step, step).astype(np.float32)
+    assert changed.dtype == np.float32
+    np.testing.assert_array_equal(changed, fresh)
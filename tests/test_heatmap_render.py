@@ -0,0 +1,74 @@
+import matplotlib
+matplotlib.use("Agg")
+
+import numpy as np
+import pandas as pd
+
+from heatmap_render import HeatmapPlot, create_figure, downsample, format_damage
+
+def test_downsample_keeps_single_cell_peaks():
+    values = np.ones((10, 10))
+    values[3, 7] = 50
+    values[8, 1] = -80
+    small, row_edges, column_edges = downsample(values, 5, 5, "max")
+    assert small.shape == (5, 5)
+    assert small[1, 3] == 50
+    assert list(row_edges) == list(column_edges) == [0, 2, 4, 6, 8, 10]
+
+    small, _, _ = downsample(values, 5, 5, "absmax")
+    assert small[1, 3] == 50 and small[4, 0] == -80  # Signed, the value furthest from 0 wins
+    assert (np.delete(small.ravel(), [1 * 5 + 3, 4 * 5 + 0]) == 1).all()
+
+def test_downsample_ignores_nan_padding():
+    # 7 x 5 in blocks of 3 x 2: the last row and column of blocks are padded with NaN, which mustn't count
+    values = np.arange(35, dtype=float).reshape(7, 5)
+    for aggregate, reduce in (("mean", np.mean), ("max", np.max), ("min", np.min)):
+        small, row_edges, column_edges = downsample(values, 3, 3, aggregate)
+        assert small.shape == (3, 3)
+        assert list(row_edges) == [0, 3, 6, 7] and list(column_edges) == [0, 2, 4, 5]
+        assert not np.isnan(small).any()
+        assert small[2, 2] == reduce(values[6:, 4:])
+        assert small[0, 2] == reduce(values[:3, 4:])
+        assert small[1, 1] == reduce(values[3:6, 2:4])
+
+def test_format_damage_only_shows_digits_float32_holds():
+    assert format_damage(12.345) == "12.35"
+    assert format_damage(99999.99) == "99999.99"
+    assert format_damage(512345.69) == "512345.7"
+    assert format_damage(-512345.69) == "-512345.7"
+    assert format_damage(6000000.3) == "6000000"
+    assert format_damage(np.float32(0.5)) == "0.50"
+
+def test_format_damage_non_finite():
+    assert format_damage(float("nan")) == "nan"
+    assert format_damage(np.inf) == "inf"
+    assert format_damage(-np.inf) == "-inf"
+
+def test_show_ranking_on_new_plot():
+    # The best item map holds integer item indices, which the first (seaborn) build must accept
+    best = np.array([[0, 1, 1], [2, 0, 1]])
+    best_df = pd.DataFrame(best, index=[1.0, 0.0], columns=[0.0, 1.0, 2.0])
+    plot = HeatmapPlot(create_figure(10))
+    plot.show_ranking(best_df, ["Fang", "Brass Knuckles", "Torch"])
+    plot.fig.canvas.draw()
+
+    assert plot.mesh.get_array().shape == best.shape
+    assert [label.get_text() for label in plot.colorbar.ax.get_yticklabels()] == ["Fang", "Brass Knuckles", "Torch"]
+
+def test_redraw_at_new_level_of_detail_keeps_labels_and_limits():
+    # What a resize does: re-run the last show_* call at the new size, with the color limits set since then
+    df = pd.DataFrame(np.linspace(-0.5, 0.5, 200 * 300).reshape(200, 300), index=np.linspace(100, 0, 200), columns=np.arange(300) / 10)
+    plot = HeatmapPlot(create_figure(10))
+    plot.lod, plot.lod_size = "mean", (50, 60)
+    plot.show_comparison(df, absolute_damage=False)
+    plot.lod_size = (100, 120)
+    plot._redraw()
+    assert plot.mesh.get_array().shape == (100, 100)
+    assert all(label.get_text().endswith("%") for label in plot.colorbar.ax.get_yticklabels())
+
+    plot.show_heatmap(df, -0.5, 0.5)
+    plot.set_color_limits(-0.1, 0.2)
+    plot.lod_size = (50, 60)
+    plot._redraw()
+    assert plot.mesh.get_clim() == (-0.1, 0.2)
+    assert plot.mesh.get_array().shape == (50, 60)
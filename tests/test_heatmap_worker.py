@@ -0,0 +1,39 @@
+import time
+
+from heatmap_worker import HeatmapWorker
+
+class FakeWidget:
+    """Stands in for a Tk widget: after() callbacks are collected and run by pump()."""
+
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, delay, callback, *args):
+        self.scheduled.append((callback, args))
+
+    def pump(self, worker, timeout=5):
+        deadline = time.monotonic() + timeout
+        while self.scheduled and time.monotonic() < deadline:
+            callback, args = self.scheduled.pop(0)
+            callback(*args)
+            time.sleep(0.001)
+
+def test_failing_callback_keeps_polling():
+    widget = FakeWidget()
+    worker = HeatmapWorker(widget)
+    delivered = []
+
+    def fail(result):
+        raise RuntimeError("callback failed")
+
+    worker.submit("Weapon 1", lambda job: 1, fail)
+    worker.submit("Weapon 2", lambda job: 2, delivered.append)
+    widget.pump(worker)
+
+    assert delivered == [2]
+    assert not worker.is_busy("Weapon 1") and not worker.is_busy("Weapon 2")
+    assert not worker._polling  # Polling stopped cleanly, so the next submit starts it again
+
+    worker.submit("Weapon 1", lambda job: 3, delivered.append)
+    widget.pump(worker)
+    assert delivered == [2, 3]